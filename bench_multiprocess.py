@@ -0,0 +1,84 @@
+"""
+Time `Hologram.reconstruct_multiprocess` against `Hologram.reconstruct_stack`.
+
+Reconstructs a synthetic off-axis hologram at a range of propagation
+distances, once with ``reconstruct_stack`` and once with each number of
+worker processes, and prints the best of ``--repeat`` runs and the speedup
+over ``reconstruct_stack``. Speedups above one need at least that many cores.
+
+    python bench_multiprocess.py --size 1024 --distances 32 --processes 1 2 4
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from shampoo import Hologram
+
+
+def off_axis_hologram(dim):
+    """
+    Off-axis hologram of a weak phase object seen through optics with a
+    quadratic phase aberration.
+    """
+    x, y = np.mgrid[0:dim, 0:dim] - dim/2
+    aberration = 2e-5*(x**2 + 0.7*y**2) + 1e-5*x*y
+    specimen = 0.3*np.exp(-((x - 50)**2 + (y + 80)**2)/200)
+    object_wave = np.exp(1j*(aberration + specimen))
+    reference_wave = np.exp(2j*np.pi*(0.23*x + 0.19*y))
+    return (500*np.abs(object_wave + reference_wave)**2 +
+            np.random.randn(dim, dim))
+
+
+def best_time(function, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=1024,
+                        help='hologram size in pixels on a side')
+    parser.add_argument('--distances', type=int, default=32,
+                        help='number of propagation distances')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4],
+                        help='numbers of worker processes to time')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of runs of each configuration')
+    args = parser.parse_args()
+
+    np.random.seed(42)
+    hologram = Hologram(off_axis_hologram(args.size))
+    distances = np.linspace(0.09, 0.11, args.distances)
+
+    # Fit the digital phase mask and plan the transforms before timing
+    hologram.fit_digital_phase_mask(np.median(distances))
+    hologram.reconstruct_stack(distances[:1])
+
+    print('{0}x{0} hologram, {1} distances, {2} cores'
+          .format(args.size, args.distances, os.cpu_count()))
+    stack_time, expected = best_time(
+        lambda: hologram.reconstruct_stack(distances), args.repeat)
+    print('reconstruct_stack:           {0:.2f} s'.format(stack_time))
+
+    for processes in args.processes:
+        pool_time, wave_cube = best_time(
+            lambda: hologram.reconstruct_multiprocess(distances,
+                                                      processes=processes),
+            args.repeat)
+        np.testing.assert_allclose(wave_cube, expected, rtol=0, atol=1e-10)
+        print('reconstruct_multiprocess({0}): {1:.2f} s, speedup {2:.2f}'
+              .format(processes, pool_time, stack_time / pool_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,7 @@ import os
 sys.path.insert(0, '/usr/lusers/bmmorris/git/shampoo/')
 
 import numpy as np
-from shampoo import Hologram, cluster_focus_peaks, locate_specimens
+from shampoo import Hologram, autofocus_specimens
 import datetime
 
 print('Beginning task: ', sys.argv, datetime.datetime.utcnow())
@@ -18,28 +18,10 @@ coords_path = os.path.join(output_dir, hologram_index+'_coords.txt')
 
 # Check that this hologram hasn't been done yet:
 if not os.path.exists(coords_path):
-    n_z_slices = 150
-    distances = np.linspace(0.09, 0.14, n_z_slices)
-
     h = Hologram.from_tif(hologram_path, crop_fraction=2**-1)
-    wave_cube = np.zeros((n_z_slices, h.n, h.n), dtype=np.complex128)
-    positions = []
-    for i, d in enumerate(distances):
-        wave = h.reconstruct(d)
-        wave_cube[i, ...] = wave.reconstructed_wave
-        detected_positions = h.detect_specimens(wave, d)
-        if detected_positions is not None:
-            positions.append(detected_positions)
-
-    positions = np.vstack(positions)
-
-    # Compress along z axis for clustering
-    positions_for_clustering = positions.copy()
-    positions_for_clustering[:, 2] /= 10
-    labels = cluster_focus_peaks(positions_for_clustering)
 
-    coords, significance = locate_specimens(wave_cube, positions, labels,
-                                            distances)
+    # Detect specimens on a coarse z-grid, then refine each focus plane
+    coords, significance = autofocus_specimens(h, 0.09, 0.14, n_coarse=30)
 
     # Save outputs
     coords_and_sig = np.column_stack([coords, significance])
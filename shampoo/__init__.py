@@ -9,3 +9,5 @@ if not _ASTROPY_SETUP_:
     from .store import *
     from .focus import *
     from .vis import *
+    from .fourier import *
+    from .batch import *
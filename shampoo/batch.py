@@ -0,0 +1,266 @@
+"""
+This module runs the reconstruction and specimen detection of every hologram
+in a shampoo HDF5 archive, with a pool of local worker processes.
+
+Results are written back into the archive along with a completion flag for
+each hologram, so that a run which is interrupted can be resumed without
+repeating any finished hologram. The ``shampoo`` command line tool calls
+`~shampoo.batch.process_archive`, see ``shampoo --help``.
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+
+from .reconstruction import Hologram, transfer_function_cache
+from .focus import autofocus_specimens
+from .store import open_hdf5_archive, load_digital_phase_mask
+from .fourier import _export_wisdom, _import_wisdom
+
+__all__ = ['process_archive', 'completed_holograms']
+
+# State of each worker process of `process_archive`
+_worker_state = dict()
+
+
+def _init_batch_worker(digital_phase_mask, hologram_kwargs, autofocus_args,
+                       autofocus_kwargs, cache_bytes=None, wisdom=None):
+    _import_wisdom(wisdom)
+    _worker_state.update(digital_phase_mask=digital_phase_mask,
+                         hologram_kwargs=hologram_kwargs,
+                         autofocus_args=autofocus_args,
+                         autofocus_kwargs=autofocus_kwargs,
+                         cache_bytes=cache_bytes)
+
+
+def _process_hologram(task):
+    """
+    Reconstruct hologram ``index`` and locate its specimens, in a worker of
+    `~shampoo.batch.process_archive`.
+    """
+    index, hologram = task
+    h = Hologram(hologram,
+                 digital_phase_mask=_worker_state['digital_phase_mask'],
+                 **_worker_state['hologram_kwargs'])
+
+    if _worker_state['cache_bytes'] is None:
+        # Cache ``G`` for the coarse grid, plus the distance at which the
+        # digital phase mask may be fit, so every hologram reuses them
+        n_coarse = _worker_state['autofocus_args'][2]
+        _worker_state['cache_bytes'] = ((n_coarse + 1) * h.n**2 *
+                                        np.dtype(h.complex_dtype).itemsize)
+    transfer_function_cache.max_bytes = _worker_state['cache_bytes']
+
+    coords, significance = autofocus_specimens(
+        h, *_worker_state['autofocus_args'],
+        **_worker_state['autofocus_kwargs'])
+    return index, np.column_stack([coords, significance])
+
+
+def completed_holograms(f):
+    """
+    Completion flags of the holograms in a shampoo HDF5 archive.
+
+    Parameters
+    ----------
+    f : `~h5py.File`
+        Opened HDF5 archive
+
+    Returns
+    -------
+    completed : `~numpy.ndarray`
+        Boolean array, True for each hologram which has been processed by
+        `~shampoo.batch.process_archive`.
+    """
+    if 'completed' not in f:
+        return np.zeros(len(f['holograms']), dtype=bool)
+    return f['completed'][...]
+
+
+def _save_specimens(f, index, specimens):
+    """
+    Store the specimens of hologram ``index``, then flag it as completed.
+
+    Specimens are stored before the flag is set, and replace any specimens
+    stored by an earlier, interrupted run, so that a hologram is either
+    completed with its specimens, or processed again.
+    """
+    name = 'specimens/{0}'.format(index)
+    if name in f:
+        del f[name]
+    dataset = f.create_dataset(name, data=specimens)
+    dataset.attrs['columns'] = ['x', 'y', 'z', 'significance']
+
+    if 'completed' not in f:
+        f.create_dataset('completed', data=np.zeros(len(f['holograms']),
+                                                    dtype=bool))
+    f['completed'][index] = True
+    f.flush()
+
+
+def process_archive(hdf5_path, min_distance, max_distance, n_coarse=16,
+                    processes=4, queue_size=None, hologram_kwargs=None,
+                    autofocus_kwargs=None, cache_bytes=None, progress=True):
+    """
+    Locate the specimens in every hologram of a shampoo HDF5 archive.
+
+    Holograms are reconstructed and searched with
+    `~shampoo.focus.autofocus_specimens` in a pool of worker processes. The
+    calling process reads the holograms from the archive and writes the
+    results back: the specimens of hologram ``i`` are stored in the
+    ``specimens/i`` dataset, in rows of ``[x, y, z, significance]``, and
+    hologram ``i`` is then flagged in the ``completed`` dataset. Holograms
+    which are already flagged are skipped, so an interrupted run resumes
+    where it stopped.
+
+    The digital phase mask stored in the archive, if any, is used for every
+    hologram, see `~shampoo.store.save_digital_phase_mask`.
+
+    Every worker process holds its own
+    `~shampoo.reconstruction.transfer_function_cache`, with a budget of
+    ``cache_bytes``. The default budget caches the transfer functions of the
+    coarse grid, ``16 * (n_coarse + 1) * n**2`` bytes per worker for ``n``
+    by ``n`` holograms in double precision.
+
+    Parameters
+    ----------
+    hdf5_path : str
+        Path to the HDF5 archive, see `~shampoo.store.create_hdf5_archive`
+    min_distance, max_distance : float
+        Range of propagation distances to search [m]
+    n_coarse : int
+        Number of propagation distances in the coarse grid of
+        `~shampoo.focus.autofocus_specimens`. Default is 16.
+    processes : int
+        Number of worker processes. With one process, holograms are
+        processed by the calling process. Default is 4.
+    queue_size : int or None
+        Maximum number of holograms sent to the workers ahead of the
+        results written. Default is None, for twice ``processes``.
+    hologram_kwargs : dict or None
+        Keyword arguments passed to `~shampoo.reconstruction.Hologram`
+    autofocus_kwargs : dict or None
+        Keyword arguments passed to `~shampoo.focus.autofocus_specimens`
+    cache_bytes : int or None
+        Memory budget of the transfer function cache of each worker
+        [bytes]. Default is None, which sizes it to the coarse grid.
+    progress : bool
+        Print the progress of the run. Default is True.
+
+    Returns
+    -------
+    n_processed : int
+        Number of holograms processed by this run
+    """
+    if hologram_kwargs is None:
+        hologram_kwargs = dict()
+    if autofocus_kwargs is None:
+        autofocus_kwargs = dict()
+
+    f = open_hdf5_archive(hdf5_path)
+    try:
+        remaining = np.flatnonzero(~completed_holograms(f))
+        if progress:
+            print('Processing {0} of {1} holograms in {2}'
+                  .format(len(remaining), len(f['holograms']), hdf5_path))
+        if len(remaining) == 0:
+            return 0
+
+        worker_args = (load_digital_phase_mask(f), hologram_kwargs,
+                       (min_distance, max_distance, n_coarse),
+                       autofocus_kwargs, cache_bytes, _export_wisdom())
+        tasks = ((index, f['holograms'][index, :, :]) for index in remaining)
+        start_time = time.time()
+
+        for i, (index, specimens) in enumerate(
+                _processed_holograms(tasks, worker_args, processes,
+                                     queue_size or 2 * processes)):
+            _save_specimens(f, index, specimens)
+            if progress:
+                print('Hologram {0}: {1} specimens ({2}/{3}, {4:.1f} s)'
+                      .format(index, len(specimens), i + 1, len(remaining),
+                              time.time() - start_time))
+        return len(remaining)
+    finally:
+        f.close()
+
+
+def _processed_holograms(tasks, worker_args, processes, queue_size):
+    """
+    Results of `_process_hologram` for each task, in order, with at most
+    ``queue_size`` tasks queued in the worker pool.
+    """
+    if processes <= 1:
+        # Restore the cache budget of the calling process afterwards
+        max_bytes = transfer_function_cache.max_bytes
+        _init_batch_worker(*worker_args)
+        try:
+            for task in tasks:
+                yield _process_hologram(task)
+        finally:
+            transfer_function_cache.max_bytes = max_bytes
+        return
+
+    pool = Pool(processes, initializer=_init_batch_worker,
+                initargs=worker_args)
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(pool.apply_async(_process_hologram, (task,)))
+            if len(pending) >= queue_size:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main(args=None):
+    """
+    Entry point of the ``shampoo`` command line tool.
+    """
+    parser = argparse.ArgumentParser(
+        description='Locate the specimens in every hologram of a shampoo '
+                    'HDF5 archive. Interrupted runs resume where they '
+                    'stopped.')
+    parser.add_argument('archive', help='Path to the HDF5 archive')
+    parser.add_argument('min_distance', type=float,
+                        help='Smallest propagation distance [m]')
+    parser.add_argument('max_distance', type=float,
+                        help='Largest propagation distance [m]')
+    parser.add_argument('--n-coarse', type=int, default=16,
+                        help='Number of propagation distances in the coarse '
+                             'focus grid (default: 16)')
+    parser.add_argument('--processes', type=int, default=4,
+                        help='Number of worker processes (default: 4)')
+    parser.add_argument('--cache-mb', type=float, default=None,
+                        help='Memory budget of the transfer function cache '
+                             'of each worker [MiB] (default: sized to the '
+                             'coarse focus grid)')
+    parser.add_argument('--crop-fraction', type=float, default=None,
+                        help='Fraction of each hologram to crop')
+    parser.add_argument('--wavelength', type=float, default=405e-9,
+                        help='Wavelength of the laser [m] (default: 405e-9)')
+    parser.add_argument('--single-precision', action='store_true',
+                        help='Reconstruct in single precision')
+    args = parser.parse_args(args)
+
+    hologram_kwargs = dict(crop_fraction=args.crop_fraction,
+                           wavelength=args.wavelength)
+    if args.single_precision:
+        hologram_kwargs['dtype'] = np.float32
+
+    cache_bytes = None
+    if args.cache_mb is not None:
+        cache_bytes = int(args.cache_mb * 2**20)
+
+    process_archive(args.archive, args.min_distance, args.max_distance,
+                    n_coarse=args.n_coarse, processes=args.processes,
+                    hologram_kwargs=hologram_kwargs, cache_bytes=cache_bytes)
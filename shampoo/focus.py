@@ -1,13 +1,15 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
-from .reconstruction import ReconstructedWave, unwrap_phase
+from .reconstruction import ReconstructedWave, WaveWindow
 
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.cluster import DBSCAN
 
-__all__ = ['cluster_focus_peaks', 'find_focus_plane', 'locate_specimens']
+__all__ = ['cluster_focus_peaks', 'find_focus_plane', 'locate_specimens',
+           'locate_specimens_stream', 'refine_focus', 'autofocus_specimens',
+           'focus_metrics']
 
 
 def cluster_focus_peaks(xyz, eps=5, min_samples=3):
@@ -39,6 +41,149 @@ def cluster_focus_peaks(xyz, eps=5, min_samples=3):
     return labels
 
 
+def _unwrap_phase_stack(roi_stack):
+    """
+    Unwrap the phase of each image in a stack of complex images at once.
+
+    Like `~shampoo.reconstruction.unwrap_phase`, this unwraps twice the
+    phase of the wave (``2 * arctan(imag / real)``). The phase is integrated
+    along the first column of each image, and then along each row, which
+    only depends on neighboring pixels, so all images are unwrapped with a
+    few vectorized operations.
+    """
+    phase = np.angle(roi_stack**2)
+    phase[..., 0] = np.unwrap(phase[..., 0], axis=-1)
+    return np.unwrap(phase, axis=-1)
+
+
+def _masked_sum(arr, mask):
+    if mask is None:
+        return np.sum(arr, axis=(-2, -1))
+    return np.sum(arr * mask, axis=(-2, -1))
+
+
+def _masked_mean_std(arr, mask):
+    if mask is None:
+        return (np.mean(arr, axis=(-2, -1)), np.std(arr, axis=(-2, -1)))
+    n_pixels = np.sum(mask, axis=(-2, -1))
+    mean = _masked_sum(arr, mask) / n_pixels
+    variance = (_masked_sum(arr**2, mask) / n_pixels - mean**2)
+    return mean, np.sqrt(np.maximum(variance, 0))
+
+
+def _mask_product(mask, *index_slices):
+    if mask is None:
+        return None
+    product = np.ones_like(mask[index_slices[0]])
+    for index_slice in index_slices:
+        product = product * mask[index_slice]
+    return product
+
+
+FOCUS_METRICS = ['amplitude', 'phase', 'phase_gradient', 'tamura',
+                 'gradient_variance', 'laplacian_energy']
+
+
+def focus_metrics(roi_stack, metrics=FOCUS_METRICS, mask=None):
+    """
+    Compute focus metrics for every image in a stack of reconstructed waves
+    at once.
+
+    Available metrics are:
+
+    * ``"amplitude"``: integral of the amplitude of the wave, which is
+      minimum at focus for amplitude objects (Dubois et al. 2006 [1]_)
+    * ``"phase"``: integral of the unwrapped phase, see
+      `~shampoo.focus.find_focus_plane`
+    * ``"phase_gradient"``: integral of the magnitude of the wrapped phase
+      gradient, which doesn't need phase unwrapping
+    * ``"tamura"``: Tamura coefficient of the amplitude,
+      ``sqrt(std / mean)``, which is maximum at focus (Memmolo et al. 2011
+      [2]_)
+    * ``"gradient_variance"``: variance of the magnitude of the gradient of
+      the amplitude
+    * ``"laplacian_energy"``: integral of the squared Laplacian of the
+      amplitude
+
+    .. [1] https://www.osapublishing.org/oe/abstract.cfm?uri=oe-14-13-5895
+    .. [2] https://doi.org/10.1364/OL.36.001945
+
+    Parameters
+    ----------
+    roi_stack : `~numpy.ndarray`
+        Complex reconstructed waves, with shape ``(..., M, L)``, for example
+        ``(N, M, L)`` for an ROI cube at ``N`` propagation distances, or
+        ``(K, N, M, L)`` for the ROI cubes of ``K`` specimens.
+    metrics : list of str (optional)
+        Names of the metrics to compute. Default is all of them.
+    mask : `~numpy.ndarray` or None (optional)
+        Boolean mask of the valid pixels, broadcastable to the shape of
+        ``roi_stack``, for stacks of ROIs with different shapes which are
+        zero-padded to a common shape at the end of each axis. Default is
+        None, for which all pixels are valid.
+
+    Returns
+    -------
+    metrics : dict
+        Arrays of shape ``roi_stack.shape[:-2]`` for each of ``metrics``
+    """
+    unknown_metrics = set(metrics) - set(FOCUS_METRICS)
+    if unknown_metrics:
+        raise ValueError('Unknown focus metrics {0}, the available metrics '
+                         'are {1}.'.format(sorted(unknown_metrics),
+                                           FOCUS_METRICS))
+
+    if mask is not None:
+        mask = np.broadcast_to(mask, roi_stack.shape).astype(float)
+
+    results = dict()
+    amplitude = np.abs(roi_stack)
+
+    # Pixel neighborhoods for finite differences
+    center = (Ellipsis, slice(None, -1), slice(None, -1))
+    below = (Ellipsis, slice(1, None), slice(None, -1))
+    right = (Ellipsis, slice(None, -1), slice(1, None))
+
+    if 'amplitude' in metrics:
+        results['amplitude'] = _masked_sum(amplitude, mask)
+
+    if 'phase' in metrics:
+        results['phase'] = _masked_sum(_unwrap_phase_stack(roi_stack), mask)
+
+    if 'phase_gradient' in metrics:
+        phase_gradient = (
+            np.abs(np.angle(roi_stack[below] * np.conj(roi_stack[center]))) +
+            np.abs(np.angle(roi_stack[right] * np.conj(roi_stack[center]))))
+        results['phase_gradient'] = _masked_sum(
+            phase_gradient, _mask_product(mask, center, below, right))
+
+    if 'tamura' in metrics:
+        mean, std = _masked_mean_std(amplitude, mask)
+        # Images which are entirely padding have no defined coefficient
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results['tamura'] = np.sqrt(std / mean)
+
+    if 'gradient_variance' in metrics:
+        gradient = np.hypot(amplitude[below] - amplitude[center],
+                            amplitude[right] - amplitude[center])
+        mean, std = _masked_mean_std(
+            gradient, _mask_product(mask, center, below, right))
+        results['gradient_variance'] = std**2
+
+    if 'laplacian_energy' in metrics:
+        inner = (Ellipsis, slice(1, -1), slice(1, -1))
+        neighbors = [(Ellipsis, slice(None, -2), slice(1, -1)),
+                     (Ellipsis, slice(2, None), slice(1, -1)),
+                     (Ellipsis, slice(1, -1), slice(None, -2)),
+                     (Ellipsis, slice(1, -1), slice(2, None))]
+        laplacian = (sum(amplitude[neighbor] for neighbor in neighbors) -
+                     4 * amplitude[inner])
+        results['laplacian_energy'] = _masked_sum(
+            laplacian**2, _mask_product(mask, inner, *neighbors))
+
+    return results
+
+
 def find_focus_plane(roi_cube, focus_on='amplitude', plot=False):
     """
     Find focus plane in a cube of reconstructed waves at different propagation
@@ -73,6 +218,18 @@ def find_focus_plane(roi_cube, focus_on='amplitude', plot=False):
         distance. For example, if ``significance < 3`` the detection of a
         specimen may be legitimate.
     """
+    metrics = focus_metrics(roi_cube, metrics=['amplitude', 'phase'])
+    return _focus_from_metrics(metrics['amplitude'], metrics['phase'],
+                               focus_on=focus_on, plot=plot)
+
+
+def _focus_from_metrics(integral_abs_wave, integral_phase_wave,
+                        focus_on='amplitude', plot=False):
+    """
+    Find the focus plane and its significance from the ``"amplitude"`` and
+    ``"phase"`` focus metrics of an ROI cube, see
+    `~shampoo.focus.find_focus_plane`.
+    """
     if focus_on == 'amplitude':
         extremum = np.argmin
     elif focus_on == 'phase':
@@ -82,15 +239,11 @@ def find_focus_plane(roi_cube, focus_on='amplitude', plot=False):
                          '"amplitude".')
 
     # Following Equation 9, 10 of Dubois et al. 2006:
-    integral_abs_wave = np.sum(np.abs(roi_cube), axis=(1, 2))
     focus_index = extremum(integral_abs_wave)
 
     # Do a similar integral on the unwrapped phase. The phase changes
     # most rapidly on a source near focus, so the derivative wrt propagation
     # distance of the phase integrated in space has a *minimum* near focus
-    integral_phase_wave = np.sum([unwrap_phase(roi_cube[i, ...])
-                                  for i in range(roi_cube.shape[0])],
-                                 axis=(1, 2))
     d_int_phase = np.diff(integral_phase_wave)
 
     # Measure significance of detected focus by taking the median normalized,
@@ -100,12 +253,13 @@ def find_focus_plane(roi_cube, focus_on='amplitude', plot=False):
     significance = np.min(d_int_phase / np.median(d_int_phase) /
                           d_int_phase.std())
     if plot:
+        n_z_slices = len(integral_abs_wave)
         plt.figure()
-        plt.plot(range(roi_cube.shape[0]),
+        plt.plot(range(n_z_slices),
                  (integral_abs_wave - integral_abs_wave.mean())/integral_abs_wave.std(),
                  label='intensity')
 
-        plt.plot(range(roi_cube.shape[0]-1),
+        plt.plot(range(n_z_slices-1),
                  (d_int_phase - d_int_phase.mean())/d_int_phase.std(),
                  label='d(phase)/d(prop dist)')
 
@@ -116,6 +270,47 @@ def find_focus_plane(roi_cube, focus_on='amplitude', plot=False):
     return focus_index, significance
 
 
+def _stack_roi_cubes(roi_cubes):
+    """
+    Zero-pad ROI cubes of different shapes at the end of each axis, and
+    stack them into one array.
+
+    Returns
+    -------
+    roi_stack : `~numpy.ndarray`
+        Stack of ROI cubes, with shape ``(K, N, M, L)``
+    mask : `~numpy.ndarray`
+        Mask of the valid pixels of each ROI, with shape ``(K, 1, M, L)``
+    """
+    shape = np.max([roi_cube.shape for roi_cube in roi_cubes], axis=0)
+    roi_stack = np.zeros((len(roi_cubes),) + tuple(shape),
+                         dtype=np.result_type(*roi_cubes))
+    mask = np.zeros((len(roi_cubes), 1) + tuple(shape[1:]), dtype=bool)
+    for roi_cube, stacked, valid in zip(roi_cubes, roi_stack, mask):
+        n, m, l = roi_cube.shape
+        stacked[:n, :m, :l] = roi_cube
+        valid[:, :m, :l] = True
+    return roi_stack, mask
+
+
+def _find_focus_planes(roi_cubes, plot=False):
+    """
+    Find the focus plane of each of ``roi_cubes`` like
+    `~shampoo.focus.find_focus_plane`, computing the focus metrics of all
+    cubes at once.
+    """
+    if len(roi_cubes) == 0:
+        return []
+
+    roi_stack, mask = _stack_roi_cubes(roi_cubes)
+    metrics = focus_metrics(roi_stack, metrics=['amplitude', 'phase'],
+                            mask=mask)
+    return [_focus_from_metrics(metrics['amplitude'][i, :len(roi_cube)],
+                                metrics['phase'][i, :len(roi_cube)],
+                                plot=plot)
+            for i, roi_cube in enumerate(roi_cubes)]
+
+
 def _correct_limits(minimum, maximum, axis_range, edge):
     if minimum < axis_range:
         minimum = axis_range
@@ -124,6 +319,45 @@ def _correct_limits(minimum, maximum, axis_range, edge):
     return minimum, maximum, axis_range
 
 
+def _specimen_rois(positions, labels, distances, wave_shape):
+    """
+    Find the region of interest around each cluster of detected positions.
+
+    Returns
+    -------
+    rois : list
+        List of ``(x_median, y_median, (z_slice, x_slice, y_slice))`` for
+        each specimen, where the slices select its ROI cube from a cube of
+        reconstructed waves of shape ``wave_shape``.
+    """
+    rois = []
+    for l in set(labels):
+        n_points = np.count_nonzero(labels == l)
+        if l != -1 and n_points > 3:
+            xmedian = np.median(positions[labels == l, 0])
+            ymedian = np.median(positions[labels == l, 1])
+            xmin, ymin, zmin_d = np.min(positions[labels == l, :], axis=0)
+            xmax, ymax, zmax_d = np.max(positions[labels == l, :], axis=0)
+            zmin = np.argmin(np.abs(zmin_d - distances))
+            zmax = np.argmin(np.abs(zmax_d - distances))
+
+            x_range = y_range = 2
+            z_range = zmax - zmin
+
+            xmin, xmax, x_range = _correct_limits(xmin, xmax, x_range,
+                                                  wave_shape[1])
+            ymin, ymay, y_range = _correct_limits(ymin, ymax, y_range,
+                                                  wave_shape[2])
+            zmin, zmaz, z_range = _correct_limits(zmin, zmax, z_range,
+                                                  wave_shape[0])
+
+            roi = (slice(int(zmin - z_range), int(zmax + z_range)),
+                   slice(int(xmin - x_range), int(xmax + x_range)),
+                   slice(int(ymin - y_range), int(ymax + y_range)))
+            rois.append((xmedian, ymedian, roi))
+    return rois
+
+
 def locate_specimens(wave_cube, positions, labels, distances, plots=False):
     """
     Identify the (x, y, z) coordinates of a specimen.
@@ -149,51 +383,284 @@ def locate_specimens(wave_cube, positions, labels, distances, plots=False):
         `~shampoo.focus.find_focus_plane` for hints on how to interpret
         the significance quantity.
     """
+    rois = _specimen_rois(positions, labels, distances, wave_cube.shape)
+
+    # Make reconstructed wave cubes centered on the regions of interest, and
+    # find the best focus in all of them at once
+    focus_planes = _find_focus_planes([wave_cube[roi]
+                                       for xmedian, ymedian, roi in rois],
+                                      plot=plots)
+
     specimen_coordinates = []
     specimen_significance = []
-    for l in set(labels):
-        n_points = np.count_nonzero(labels == l)
-        if l != -1 and n_points > 3:
-            xmedian = np.median(positions[labels == l, 0])
-            ymedian = np.median(positions[labels == l, 1])
-            xmin, ymin, zmin_d = np.min(positions[labels == l, :], axis=0)
-            xmax, ymax, zmax_d = np.max(positions[labels == l, :], axis=0)
-            zmin = np.argmin(np.abs(zmin_d - distances))
-            zmax = np.argmin(np.abs(zmax_d - distances))
+    for (xmedian, ymedian, roi), (focus_ind_minus_margin, significance) in \
+            zip(rois, focus_planes):
+        focus_ind = focus_ind_minus_margin + roi[0].start
 
-            x_range = y_range = 2
-            z_range = zmax - zmin
+        specimen_coordinates.append([xmedian, ymedian,
+                                     distances[focus_ind]])
+        specimen_significance.append(significance)
 
-            xmin, xmax, x_range = _correct_limits(xmin, xmax, x_range,
-                                                  wave_cube.shape[1])
-            ymin, ymay, y_range = _correct_limits(ymin, ymax, y_range,
-                                                  wave_cube.shape[2])
-            zmin, zmaz, z_range = _correct_limits(zmin, zmax, z_range,
-                                                  wave_cube.shape[0])
+        if plots:
+            focused_wave = ReconstructedWave(wave_cube[focus_ind, ...])
 
-            # Make a reconstructed wave cube centered on the region of interest
-            roi_cube = wave_cube[zmin - z_range:zmax + z_range,
-                                 xmin - x_range:xmax + x_range,
-                                 ymin - y_range:ymax + y_range]
+            fig, ax = focused_wave.plot(phase=True)
+            thetas = np.linspace(0, 2*np.pi, 30)
+            r = 20
+            ax.plot(r*np.cos(thetas) + ymedian,
+                    r*np.sin(thetas) + xmedian, lw=3, color='r')
+            plt.show()
 
-            # Using this cropped cube centered on the ROI, find the best focus
+    return np.array(specimen_coordinates), np.array(specimen_significance)
 
-            focus_ind_minus_margin, significance = find_focus_plane(roi_cube,
-                                                                    plot=plots)
-            focus_ind = focus_ind_minus_margin + zmin - z_range
 
-            specimen_coordinates.append([xmedian, ymedian,
-                                         distances[focus_ind]])
-            specimen_significance.append(significance)
+def locate_specimens_stream(reconstructed_waves, positions, labels,
+                            distances, plots=False):
+    """
+    Identify the (x, y, z) coordinates of a specimen from a stream of
+    reconstructed waves.
 
-            if plots:
-                focused_wave = ReconstructedWave(wave_cube[focus_ind, ...])
+    Equivalent to `~shampoo.focus.locate_specimens`, but rather than a full
+    cube of reconstructed waves, this takes an iterable over the waves at
+    each of ``distances``, such as
+    `~shampoo.reconstruction.Hologram.iter_reconstructions`, and keeps only
+    the small ROI stamps around each specimen.
 
-                fig, ax = focused_wave.plot(phase=True)
-                thetas = np.linspace(0, 2*np.pi, 30)
-                r = 20
-                ax.plot(r*np.cos(thetas) + ymedian,
-                        r*np.sin(thetas) + xmedian, lw=3, color='r')
-                plt.show()
+    Parameters
+    ----------
+    reconstructed_waves : iterable
+        Iterable of `~shampoo.reconstruction.ReconstructedWave` objects, one
+        for each propagation distance in ``distances``
+    positions : `~numpy.ndarray`
+        (x,y,z) positions of objects detected by the blob finder
+    labels : `~numpy.ndarray`
+        Clustering labels for each (x,y,z) coordinate, identifying groups
+        of positions, i.e., single particles detected at multiple z-planes
+    distances : `~numpy.ndarray`
+        Propagation distances of the reconstructed waves
+    plots : bool (optional)
+        Plot the focus metrics of each specimen. Default is False.
+
+    Returns
+    -------
+    specimen_coordinates : `~numpy.ndarray`
+        (x, y, z) coordinates of each detected specimen
+    specimen_coordinates : `~numpy.ndarray`
+        Significance of each specimen detection. See docs of
+        `~shampoo.focus.find_focus_plane` for hints on how to interpret
+        the significance quantity.
+    """
+    rois = None
+    stamps = None
+    for i, wave in enumerate(reconstructed_waves):
+        reconstructed_wave = wave.reconstructed_wave
+        if rois is None:
+            rois = _specimen_rois(positions, labels, distances,
+                                  (len(distances),) +
+                                  reconstructed_wave.shape)
+            stamps = [[] for roi in rois]
+
+        for (xmedian, ymedian, roi), roi_stamps in zip(rois, stamps):
+            if roi[0].start <= i < roi[0].stop:
+                roi_stamps.append(reconstructed_wave[roi[1:]].copy())
+
+    focus_planes = _find_focus_planes([np.array(roi_stamps)
+                                       for roi_stamps in stamps or []],
+                                      plot=plots)
+
+    specimen_coordinates = []
+    specimen_significance = []
+    for (xmedian, ymedian, roi), (focus_ind_minus_margin, significance) in \
+            zip(rois or [], focus_planes):
+        focus_ind = focus_ind_minus_margin + roi[0].start
+
+        specimen_coordinates.append([xmedian, ymedian,
+                                     distances[focus_ind]])
+        specimen_significance.append(significance)
 
     return np.array(specimen_coordinates), np.array(specimen_significance)
+
+
+def refine_focus(hologram, roi, bracket, focus_on='amplitude', xtol=1e-5,
+                 reference_wave=None, reference_distance=None, padding=32):
+    """
+    Refine the focus plane of a specimen with Brent's method.
+
+    The focus metric of `~shampoo.focus.find_focus_plane`, the integral of
+    the amplitude of the reconstructed wave over the region of interest,
+    is minimized (or maximized, if ``focus_on="phase"``) within ``bracket``
+    with `~scipy.optimize.minimize_scalar`, so that the focus is found with
+    a precision of ``xtol`` from a few reconstructions.
+
+    If ``reference_wave`` is given, only the ROI is reconstructed at each
+    step, by propagating it from ``reference_wave`` with
+    `~shampoo.reconstruction.Hologram.reconstruct_roi`, rather than
+    reconstructing the full frame.
+
+    Parameters
+    ----------
+    hologram : `~shampoo.reconstruction.Hologram`
+        Hologram containing the specimen
+    roi : tuple of slices
+        Region of interest around the specimen, in pixels of the
+        reconstructed wave
+    bracket : tuple
+        Lower and upper propagation distance [m] to search. The focus metric
+        should have a single extremum in this interval.
+    focus_on : {"amplitude", "phase"} (optional)
+        Focus on the phase or amplitude?
+    xtol : float (optional)
+        Tolerance of the focus distance [m]. Default is 1e-5.
+    reference_wave : `~shampoo.reconstruction.ReconstructedWave`, `~shampoo.reconstruction.WaveWindow` or None (optional)
+        Wave reconstructed from ``hologram`` at ``reference_distance``,
+        ideally near the focus, or a window of it around ``roi``, to
+        propagate the ROI from. Default is None, which reconstructs the full
+        frame at each step.
+    reference_distance : float or None (optional)
+        Propagation distance of ``reference_wave`` [m]
+    padding : int (optional)
+        Padding of the propagated window around the ROI, see
+        `~shampoo.reconstruction.Hologram.reconstruct_roi`. Default is 32.
+
+    Returns
+    -------
+    focus_distance : float
+        Propagation distance of the focus plane [m]
+    """
+    from scipy.optimize import minimize_scalar
+
+    if focus_on == 'amplitude':
+        sign = 1
+    elif focus_on == 'phase':
+        sign = -1
+    else:
+        raise ValueError('The `focus_on` kwarg must be either "phase" or '
+                         '"amplitude".')
+
+    def focus_metric(propagation_distance):
+        if reference_wave is None:
+            roi_wave = hologram.reconstruct_wave(propagation_distance)[roi]
+        else:
+            roi_wave = hologram.reconstruct_roi(reference_wave,
+                                                reference_distance,
+                                                [propagation_distance], roi,
+                                                padding=padding)[0]
+        return sign * np.sum(np.abs(roi_wave))
+
+    result = minimize_scalar(focus_metric, bounds=bracket, method='bounded',
+                             options=dict(xatol=xtol))
+    return result.x
+
+
+def autofocus_specimens(hologram, min_distance, max_distance, n_coarse=16,
+                        focus_on='amplitude', xtol=1e-5, padding=32, eps=5,
+                        min_samples=3, detect_kwargs=None):
+    """
+    Locate specimens in a hologram with a coarse-to-fine focus search.
+
+    Specimens are detected with
+    `~shampoo.reconstruction.Hologram.detect_specimens` on a coarse grid of
+    ``n_coarse`` propagation distances, clustered with
+    `~shampoo.focus.cluster_focus_peaks`, and their focus is found on the
+    coarse grid as in `~shampoo.focus.locate_specimens_stream`. The focus of
+    each specimen is then refined with `~shampoo.focus.refine_focus`,
+    within one coarse step on either side of the coarse focus, by
+    propagating only a small window around the specimen from the wave
+    reconstructed at its coarse focus.
+
+    This reaches a z-precision of ``xtol`` with ``2 * n_coarse`` full-frame
+    reconstructions of the coarse grid, rather than a dense grid with a
+    spacing of ``xtol``. While the coarse focus is located, the padded
+    window around each specimen is kept, as a
+    `~shampoo.reconstruction.WaveWindow`, from each wave within the z-range
+    of the specimen, so that refining needs no further full-frame
+    reconstructions, and no full-frame wave is held in memory.
+
+    Parameters
+    ----------
+    hologram : `~shampoo.reconstruction.Hologram`
+        Hologram to search
+    min_distance, max_distance : float
+        Range of propagation distances to search [m]
+    n_coarse : int (optional)
+        Number of propagation distances in the coarse grid. Default is 16.
+    focus_on : {"amplitude", "phase"} (optional)
+        Focus on the phase or amplitude?
+    xtol : float (optional)
+        Tolerance of the refined focus distances [m]. Default is 1e-5.
+    padding : int (optional)
+        Padding of the propagated window around each specimen, see
+        `~shampoo.reconstruction.Hologram.reconstruct_roi`. Default is 32.
+    eps : float (optional)
+        Passed to `~shampoo.focus.cluster_focus_peaks`
+    min_samples : int (optional)
+        Passed to `~shampoo.focus.cluster_focus_peaks`
+    detect_kwargs : dict or None (optional)
+        Keyword arguments passed to
+        `~shampoo.reconstruction.Hologram.detect_specimens`
+
+    Returns
+    -------
+    specimen_coordinates : `~numpy.ndarray`
+        (x, y, z) coordinates of each detected specimen
+    specimen_significance : `~numpy.ndarray`
+        Significance of each specimen detection on the coarse grid, see
+        `~shampoo.focus.find_focus_plane`.
+    """
+    if detect_kwargs is None:
+        detect_kwargs = dict()
+
+    distances = np.linspace(min_distance, max_distance, n_coarse)
+    step = distances[1] - distances[0]
+
+    # Detect specimens on the coarse grid
+    positions = []
+    for wave, distance in zip(hologram.iter_reconstructions(distances),
+                              distances):
+        detected_positions = hologram.detect_specimens(wave, distance,
+                                                       **detect_kwargs)
+        if detected_positions is not None:
+            positions.append(detected_positions)
+
+    if len(positions) == 0:
+        return np.empty((0, 3)), np.empty(0)
+
+    positions = np.vstack(positions)
+    labels = cluster_focus_peaks(positions, eps=eps, min_samples=min_samples)
+    rois = _specimen_rois(positions, labels, distances,
+                          (n_coarse, hologram.n, hologram.n))
+
+    # Keep the windows around each specimen within its z-range, which is
+    # where its coarse focus is found
+    windows = [dict() for roi in rois]
+
+    def _keep_windows(waves):
+        for i, wave in enumerate(waves):
+            for (xmedian, ymedian, roi), specimen_windows in zip(rois,
+                                                                 windows):
+                if roi[0].start <= i < roi[0].stop:
+                    specimen_windows[i] = WaveWindow(wave, roi[1:], padding)
+            yield wave
+
+    # Coarse focus of each specimen
+    specimen_coordinates, specimen_significance = locate_specimens_stream(
+        _keep_windows(hologram.iter_reconstructions(distances)), positions,
+        labels, distances)
+    if len(specimen_coordinates) == 0:
+        return np.empty((0, 3)), np.empty(0)
+
+    # Refine the focus of each specimen around its coarse focus, propagating
+    # only the ROI from its window at the coarse focus
+    for index, ((xmedian, ymedian, roi), specimen_windows) in \
+            enumerate(zip(rois, windows)):
+        coarse_focus = specimen_coordinates[index, 2]
+        bracket = (max(coarse_focus - step, min_distance),
+                   min(coarse_focus + step, max_distance))
+        reference_wave = specimen_windows[
+            int(np.argmin(np.abs(distances - coarse_focus)))]
+        specimen_coordinates[index, 2] = refine_focus(
+            hologram, roi[1:], bracket, focus_on=focus_on, xtol=xtol,
+            reference_wave=reference_wave, reference_distance=coarse_focus,
+            padding=padding)
+
+    return specimen_coordinates, specimen_significance
@@ -0,0 +1,413 @@
+"""
+This module provides the Fourier transforms used throughout shampoo through
+a backend which can be chosen at runtime.
+
+Three backends are available: `~shampoo.fourier.ScipyFFTBackend` (multi-
+threaded via the ``workers`` argument of `scipy.fft`),
+`~shampoo.fourier.NumpyFFTBackend`, and `~shampoo.fourier.PyFFTWBackend`,
+which keeps planned FFTW transforms for each array shape, and can save and
+load FFTW wisdom so that planning costs are only paid once.
+
+Every transform takes an optional ``out`` array for the result. The pyFFTW
+backend writes into it directly if its dtype, shape and alignment suit the
+plan; the other backends copy the result into it.
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+__all__ = ['ScipyFFTBackend', 'NumpyFFTBackend', 'PyFFTWBackend',
+           'set_fft_backend', 'get_fft_backend', 'save_fftw_wisdom',
+           'load_fftw_wisdom']
+
+
+def _into(result, out):
+    """
+    Copy ``result`` into ``out``, if given, for backends which can't write
+    into it directly.
+    """
+    if out is None:
+        return result
+    out[...] = result
+    return out
+
+
+class ScipyFFTBackend(object):
+    """
+    Fourier transforms with `scipy.fft`, or `scipy.fftpack` for older
+    versions of scipy.
+    """
+    name = 'scipy'
+
+    def __init__(self, threads=1):
+        """
+        Parameters
+        ----------
+        threads : int
+            Number of workers used by `scipy.fft` for each transform. Ignored
+            when falling back on `scipy.fftpack`.
+        """
+        self.threads = threads
+
+        try:
+            import scipy.fft as scipy_fft
+            self._kwargs = dict(workers=threads)
+        except ImportError:
+            import scipy.fftpack as scipy_fft
+            self._kwargs = dict()
+
+        self._fft = scipy_fft
+
+    def fft2(self, arr, out=None):
+        return _into(self._fft.fft2(arr, **self._kwargs), out)
+
+    def ifft2(self, arr, out=None):
+        return _into(self._fft.ifft2(arr, **self._kwargs), out)
+
+    def fftn(self, arr, out=None):
+        return _into(self._fft.fftn(arr, **self._kwargs), out)
+
+    def ifftn(self, arr, out=None):
+        return _into(self._fft.ifftn(arr, **self._kwargs), out)
+
+    def rfft2(self, arr, out=None):
+        # scipy.fftpack has no 2D real transforms
+        if not hasattr(self._fft, 'rfft2'):
+            return _into(np.fft.rfft2(arr), out)
+        return _into(self._fft.rfft2(arr, **self._kwargs), out)
+
+    def irfft2(self, arr, shape, out=None):
+        if not hasattr(self._fft, 'irfft2'):
+            return _into(np.fft.irfft2(arr, shape), out)
+        return _into(self._fft.irfft2(arr, shape, **self._kwargs), out)
+
+
+class NumpyFFTBackend(object):
+    """
+    Fourier transforms with `numpy.fft`.
+    """
+    name = 'numpy'
+
+    def __init__(self, threads=1):
+        """
+        Parameters
+        ----------
+        threads : int
+            Ignored, `numpy.fft` is single-threaded.
+        """
+        self.threads = 1
+
+    def fft2(self, arr, out=None):
+        return _into(np.fft.fft2(arr), out)
+
+    def ifft2(self, arr, out=None):
+        return _into(np.fft.ifft2(arr), out)
+
+    def fftn(self, arr, out=None):
+        return _into(np.fft.fftn(arr), out)
+
+    def ifftn(self, arr, out=None):
+        return _into(np.fft.ifftn(arr), out)
+
+    def rfft2(self, arr, out=None):
+        return _into(np.fft.rfft2(arr), out)
+
+    def irfft2(self, arr, shape, out=None):
+        return _into(np.fft.irfft2(arr, shape), out)
+
+
+class PyFFTWBackend(object):
+    """
+    Planned Fourier transforms with `pyfftw.builders`.
+
+    One FFTW object is planned for each combination of transform, array
+    shape and dtype, and cached for reuse. Plans are kept per thread, since
+    FFTW objects can't be executed by several threads at once, and only the
+    ``max_plans`` most recently used plans of each thread are kept.
+
+    Transforms read the input array in place and write into ``out``, or into
+    a new aligned array, so no copies are made unless the input is misaligned
+    or of another dtype than the plan, ``out`` doesn't suit the plan, or the
+    transform is `irfft2`, which overwrites its input.
+
+    Measuring plans costs up to hundreds of milliseconds for each new shape,
+    far more than the transforms of small arrays, so by default plans are
+    only estimated, unless FFTW wisdom has been loaded with
+    `~shampoo.fourier.load_fftw_wisdom`.
+    """
+    name = 'pyfftw'
+
+    def __init__(self, threads=1, planner_effort=None, wisdom_path=None,
+                 max_plans=32):
+        """
+        Parameters
+        ----------
+        threads : int
+            Number of threads used by FFTW for each transform
+        planner_effort : str or None
+            FFTW planner flag, i.e. one of ``'FFTW_ESTIMATE'``,
+            ``'FFTW_MEASURE'``, ``'FFTW_PATIENT'`` or ``'FFTW_EXHAUSTIVE'``.
+            Default is None, for ``'FFTW_MEASURE'`` if wisdom has been
+            loaded and ``'FFTW_ESTIMATE'`` otherwise.
+        wisdom_path : str or None
+            If not None, load FFTW wisdom from this path, if it exists.
+        max_plans : int
+            Maximum number of plans kept by each thread. Default is 32.
+        """
+        import pyfftw
+        import pyfftw.builders
+
+        self._pyfftw = pyfftw
+        self.threads = threads
+        self._planner_effort = planner_effort
+        self.max_plans = max_plans
+        self._local = threading.local()
+
+        if wisdom_path is not None and os.path.exists(wisdom_path):
+            load_fftw_wisdom(wisdom_path)
+
+    @property
+    def planner_effort(self):
+        """
+        FFTW planner flag used for new plans
+        """
+        if self._planner_effort is not None:
+            return self._planner_effort
+        return 'FFTW_MEASURE' if _wisdom_loaded else 'FFTW_ESTIMATE'
+
+    def _plan(self, builder_name, arr, s=None):
+        """
+        Get the cached FFTW object for ``arr``, planning one if necessary,
+        with the input and output arrays it was planned with.
+        """
+        plans = getattr(self._local, 'plans', None)
+        if plans is None:
+            plans = self._local.plans = OrderedDict()
+
+        key = (builder_name, arr.shape, arr.dtype.str, s)
+        plan = plans.pop(key, None)
+        if plan is None:
+            builder = getattr(self._pyfftw.builders, builder_name)
+            aligned = self._pyfftw.empty_aligned(arr.shape, dtype=arr.dtype)
+            fftw = builder(aligned, s=s, threads=self.threads,
+                           planner_effort=self.planner_effort)
+            plan = (fftw, fftw.input_array, fftw.output_array)
+            while len(plans) >= self.max_plans:
+                plans.popitem(last=False)
+        # Mark as most recently used
+        plans[key] = plan
+        return plan
+
+    def _suits(self, fftw, out):
+        """
+        Whether FFTW can write the result of ``fftw`` into ``out`` directly.
+        """
+        return (out.dtype == fftw.output_dtype and
+                out.shape == tuple(fftw.output_shape) and
+                out.flags.c_contiguous and
+                self._pyfftw.is_byte_aligned(out, fftw.output_alignment))
+
+    def _execute(self, builder_name, arr, s=None, out=None):
+        arr = np.asarray(arr)
+        fftw, planned_input, planned_output = self._plan(builder_name, arr, s)
+
+        if out is not None and not self._suits(fftw, out):
+            out[...] = self._execute(builder_name, arr, s)
+            return out
+        if out is None:
+            out = self._pyfftw.empty_aligned(fftw.output_shape,
+                                             dtype=fftw.output_dtype)
+        if builder_name == 'irfft2':
+            # Multi-dimensional inverse real transforms overwrite their input
+            arr_copy = self._pyfftw.empty_aligned(arr.shape,
+                                                  dtype=fftw.input_dtype,
+                                                  n=fftw.input_alignment)
+            arr_copy[...] = arr
+            arr = arr_copy
+
+        try:
+            return fftw(arr, output_array=out)
+        finally:
+            # Don't keep references to the arrays of the caller
+            fftw.update_arrays(planned_input, planned_output)
+
+    def fft2(self, arr, out=None):
+        return self._execute('fft2', arr, out=out)
+
+    def ifft2(self, arr, out=None):
+        return self._execute('ifft2', arr, out=out)
+
+    def fftn(self, arr, out=None):
+        return self._execute('fftn', arr, out=out)
+
+    def ifftn(self, arr, out=None):
+        return self._execute('ifftn', arr, out=out)
+
+    def rfft2(self, arr, out=None):
+        return self._execute('rfft2', arr, out=out)
+
+    def irfft2(self, arr, shape, out=None):
+        return self._execute('irfft2', arr, tuple(shape), out=out)
+
+
+_backends = dict(scipy=ScipyFFTBackend, numpy=NumpyFFTBackend,
+                 pyfftw=PyFFTWBackend)
+
+
+# Whether FFTW wisdom has been loaded in this process
+_wisdom_loaded = False
+
+
+def _default_backend():
+    try:
+        return PyFFTWBackend()
+    except ImportError:
+        return ScipyFFTBackend()
+
+
+_current_backend = None
+
+
+def set_fft_backend(backend='scipy', threads=1, **kwargs):
+    """
+    Set the backend used for all Fourier transforms in shampoo.
+
+    Parameters
+    ----------
+    backend : {"scipy", "numpy", "pyfftw"} or backend instance
+        Name of the backend, or an instance of one of
+        `~shampoo.fourier.ScipyFFTBackend`,
+        `~shampoo.fourier.NumpyFFTBackend` or
+        `~shampoo.fourier.PyFFTWBackend`.
+    threads : int
+        Number of threads to use for each transform, if ``backend`` is a
+        name.
+    kwargs : dict
+        Additional keyword arguments passed to the backend, if ``backend``
+        is a name.
+
+    Returns
+    -------
+    backend : backend instance
+        The new FFT backend
+    """
+    global _current_backend
+
+    if not hasattr(backend, 'fft2'):
+        if backend not in _backends:
+            raise ValueError('The FFT backend must be one of {0}, got "{1}".'
+                             .format(sorted(_backends), backend))
+        backend = _backends[backend](threads=threads, **kwargs)
+
+    _current_backend = backend
+    return backend
+
+
+def get_fft_backend():
+    """
+    Get the backend used for all Fourier transforms in shampoo.
+
+    Defaults to `~shampoo.fourier.PyFFTWBackend` if pyFFTW is installed,
+    and `~shampoo.fourier.ScipyFFTBackend` otherwise.
+
+    Returns
+    -------
+    backend : backend instance
+        The current FFT backend
+    """
+    global _current_backend
+
+    if _current_backend is None:
+        _current_backend = _default_backend()
+    return _current_backend
+
+
+def save_fftw_wisdom(path):
+    """
+    Save the accumulated FFTW wisdom to ``path``.
+
+    Parameters
+    ----------
+    path : str
+        Path to the wisdom file
+    """
+    import pyfftw
+
+    with open(path, 'wb') as wisdom_file:
+        pickle.dump(pyfftw.export_wisdom(), wisdom_file)
+
+
+def load_fftw_wisdom(path):
+    """
+    Load FFTW wisdom saved with `~shampoo.fourier.save_fftw_wisdom`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the wisdom file
+    """
+    with open(path, 'rb') as wisdom_file:
+        _import_wisdom(pickle.load(wisdom_file))
+
+
+def _export_wisdom():
+    """
+    FFTW wisdom of this process, to pass to worker processes with
+    `_import_wisdom`, or None if no wisdom has been loaded.
+    """
+    if not _wisdom_loaded:
+        return None
+    import pyfftw
+    return pyfftw.export_wisdom()
+
+
+def _import_wisdom(wisdom):
+    """
+    Import FFTW wisdom exported with `_export_wisdom`, if any.
+    """
+    global _wisdom_loaded
+
+    if wisdom is None:
+        return
+    import pyfftw
+    pyfftw.import_wisdom(wisdom)
+    _wisdom_loaded = True
+
+
+def fft2(arr, out=None):
+    """2D Fourier transform of ``arr`` with the current backend."""
+    return get_fft_backend().fft2(arr, out=out)
+
+
+def ifft2(arr, out=None):
+    """2D inverse Fourier transform of ``arr`` with the current backend."""
+    return get_fft_backend().ifft2(arr, out=out)
+
+
+def rfft2(arr, out=None):
+    """2D Fourier transform of the real array ``arr`` with the current
+    backend."""
+    return get_fft_backend().rfft2(arr, out=out)
+
+
+def irfft2(arr, shape, out=None):
+    """2D inverse Fourier transform with the current backend, to a real
+    array of shape ``shape``."""
+    return get_fft_backend().irfft2(arr, shape, out=out)
+
+
+def fftn(arr, out=None):
+    """N-D Fourier transform of ``arr`` with the current backend."""
+    return get_fft_backend().fftn(arr, out=out)
+
+
+def ifftn(arr, out=None):
+    """N-D inverse Fourier transform of ``arr`` with the current backend."""
+    return get_fft_backend().ifftn(arr, out=out)
@@ -7,26 +7,132 @@ and their reconstructions via HDF5.
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import time
+from collections import deque
+from multiprocessing import Pool, Process, Queue
+try:
+    from queue import Empty, Full
+except ImportError:
+    from Queue import Empty, Full
+
 import numpy as np
 import h5py
 import os
 from skimage.io import imread
 from astropy.utils.console import ProgressBar
 
-__all__ = ['create_hdf5_archive', 'open_hdf5_archive']
+__all__ = ['create_hdf5_archive', 'ingest_holograms', 'open_hdf5_archive',
+           'save_digital_phase_mask', 'load_digital_phase_mask',
+           'save_reconstruction', 'load_reconstruction', 'ArchiveWriter']
+
+RECONSTRUCTION_MODES = ['complex', 'amplitude_phase', 'roi']
+_RECONSTRUCTION_DATASETS = dict(
+    complex=['reconstructed_wavefields'],
+    amplitude_phase=['reconstructed_amplitude', 'reconstructed_wrapped_phase'])
+
+
+def tiff_to_ndarray(path, dtype=np.float64):
+    """Read in TIFF file, return `~numpy.ndarray` of type ``dtype``, or of
+    the native type of the TIFF if ``dtype`` is None"""
+    return np.array(imread(path), dtype=dtype)
+
+
+def _decode_hologram(args):
+    """Decode one TIFF for `~shampoo.store.ingest_holograms`"""
+    path, dtype = args
+    return tiff_to_ndarray(path, dtype)
+
 
+def ingest_holograms(dataset, hologram_paths, processes=None, queue_size=8,
+                     progress=True):
+    """
+    Decode TIFF holograms in a pool of worker processes, and write them into
+    consecutive frames of ``dataset``.
+
+    Decoded frames are written in order by the calling process, which is the
+    only writer of ``dataset``. At most ``queue_size`` frames are decoded
+    ahead of the writes, to bound memory use.
 
-def tiff_to_ndarray(path):
-    """Read in TIFF file, return `~numpy.ndarray`"""
-    return np.array(imread(path), dtype=np.float64)
+    Parameters
+    ----------
+    dataset : `~h5py.Dataset`
+        Dataset with shape ``(N, M, L)``, with at least as many frames ``N``
+        as ``hologram_paths``. Frames are converted to the dtype of
+        ``dataset``.
+    hologram_paths : list
+        Paths to the TIFF holograms
+    processes : int or None
+        Number of worker processes decoding TIFFs. With one process, TIFFs
+        are decoded by the calling process. Workers pay off when decoding
+        dominates and there are cores to spare, but pickling the frames back
+        from them costs more than it saves on a single core. Default is
+        None, for one process per core, `os.cpu_count`.
+    queue_size : int
+        Maximum number of decoded frames waiting to be written. Default is 8.
+    progress : bool
+        Show a progress bar. Default is True.
+
+    Returns
+    -------
+    frames_per_second : float
+        Ingest throughput [frames/s]
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    tasks = [(path, dataset.dtype) for path in hologram_paths]
+    start_time = time.time()
+
+    def _write_frames(frames, bar=None):
+        for i, frame in enumerate(frames):
+            dataset[i, :, :] = frame
+            if bar is not None:
+                bar.update()
+
+    def _decoded_frames():
+        if processes <= 1:
+            for task in tasks:
+                yield _decode_hologram(task)
+            return
+
+        pool = Pool(processes)
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(pool.apply_async(_decode_hologram, (task,)))
+                if len(pending) >= queue_size:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    if progress:
+        with ProgressBar(len(tasks)) as bar:
+            _write_frames(_decoded_frames(), bar)
+    else:
+        _write_frames(_decoded_frames())
+
+    elapsed_time = time.time() - start_time
+    return len(tasks) / elapsed_time if elapsed_time > 0 else np.inf
 
 
 def create_hdf5_archive(hdf5_path, hologram_paths, n_z, metadata={},
-                        compression='lzf', overwrite=False):
+                        compression='lzf', overwrite=False,
+                        digital_phase_mask=None,
+                        reconstruction_dtype=np.complex128,
+                        hologram_dtype=None, processes=None, queue_size=8,
+                        reconstruction_mode='complex'):
     """
     Create HDF5 file structure for holograms and phase/intensity
     reconstructions.
 
+    No space is allocated for reconstructions up front: the datasets for
+    reconstructions are created when the first one is saved with
+    `~shampoo.store.save_reconstruction`, with one chunk per hologram and
+    z-slice, so that only the chunks of saved slices are stored.
+
     Parameters
     ----------
     hdf5_path : string
@@ -34,9 +140,41 @@ def create_hdf5_archive(hdf5_path, hologram_paths, n_z, metadata={},
     hologram_paths : string
         List of all holograms
     n_z : int
-        Number of z-stacks to allocate space for
+        Number of z-slices per hologram to declare in the reconstruction
+        datasets. Datasets grow if later slices are saved.
     meta : dict
         Metadata to store with in top-level of the HDF5 archive
+    digital_phase_mask : `~numpy.ndarray` or None
+        Digital phase mask to store with the holograms, see
+        `~shampoo.store.save_digital_phase_mask`.
+    reconstruction_dtype : {`~numpy.complex128`, `~numpy.complex64`}
+        Data type of the ``reconstructed_wavefields`` dataset. Use
+        `~numpy.complex64` with single precision reconstructions, see the
+        ``dtype`` argument of `~shampoo.reconstruction.Hologram`, to halve
+        the size of the archive. Default is `~numpy.complex128`.
+    reconstruction_mode : {"complex", "amplitude_phase", "roi"}
+        What to store for each reconstructed slice: the full complex wave in
+        ``reconstructed_wavefields``, its amplitude and wrapped phase as
+        `~numpy.float32` in ``reconstructed_amplitude`` and
+        ``reconstructed_wrapped_phase``, or only stamps of regions of
+        interest in the ``reconstructed_rois`` group. The amplitude is the
+        modulus of the wave, which is what
+        `~shampoo.reconstruction.ReconstructedWave.intensity` returns, and
+        the phase is `~numpy.angle` of the wave, in ``(-pi, pi]``, rather
+        than the unwrapped
+        `~shampoo.reconstruction.ReconstructedWave.phase`, so that the wave
+        can be rebuilt from them. Default is ``"complex"``.
+    hologram_dtype : `~numpy.dtype` or None
+        Data type of the ``holograms`` dataset. Default is None, which keeps
+        the native data type of the camera, usually an unsigned integer type
+        several times smaller than `~numpy.float64`.
+    processes : int or None
+        Number of worker processes decoding TIFFs, see
+        `~shampoo.store.ingest_holograms`. Default is None, for one process
+        per core.
+    queue_size : int
+        Maximum number of decoded holograms waiting to be written. Default
+        is 8.
 
     Returns
     -------
@@ -48,14 +186,23 @@ def create_hdf5_archive(hdf5_path, hologram_paths, n_z, metadata={},
                          "use `overwrite=True`."
                          .format(hdf5_path))
 
-    f = h5py.File(hdf5_path, 'w')
+    if reconstruction_mode not in RECONSTRUCTION_MODES:
+        raise ValueError('The reconstruction mode must be one of {0}, got '
+                         '"{1}".'.format(RECONSTRUCTION_MODES,
+                                         reconstruction_mode))
+
+    # The latest file format is required to write the archive in single
+    # writer, multiple reader mode later, see `ArchiveWriter`
+    f = h5py.File(hdf5_path, 'w', libver='latest')
 
-    first_image = tiff_to_ndarray(hologram_paths[0])
+    first_image = tiff_to_ndarray(hologram_paths[0], hologram_dtype)
 
-    # Create datasets for holograms, fill it in with holograms, metadata
+    # Create datasets for holograms, fill it in with holograms, metadata.
+    # Holograms are read and written one at a time, so each is one chunk
     f.create_dataset('holograms', dtype=first_image.dtype,
                      shape=(len(hologram_paths),
                             first_image.shape[0], first_image.shape[1]),
+                     chunks=(1, first_image.shape[0], first_image.shape[1]),
                      compression=compression)
 
     # Update attributes on `holograms` with metadata
@@ -63,20 +210,24 @@ def create_hdf5_archive(hdf5_path, hologram_paths, n_z, metadata={},
 
     holograms_dset = f['holograms']
     print('Loading holograms into file {0}...'.format(hdf5_path))
-    with ProgressBar(len(hologram_paths)) as bar:
-        for i, path in enumerate(hologram_paths):
-            holograms_dset[i, :, :] = tiff_to_ndarray(path)
-            bar.update()
-
-    # Create empty datasets for reconstructions
-    reconstruction_dtype = np.complex128
-    f.create_dataset('reconstructed_wavefields', dtype=reconstruction_dtype,
-                     shape=(len(hologram_paths), n_z,
-                            first_image.shape[0], first_image.shape[1]),
-                     compression=compression)
+    frames_per_second = ingest_holograms(holograms_dset, hologram_paths,
+                                         processes=processes,
+                                         queue_size=queue_size)
+    print('Loaded {0} holograms ({1:.1f} frames/s)'
+          .format(len(hologram_paths), frames_per_second))
+
+    # Reconstruction datasets are created by `save_reconstruction`
+    f.attrs['reconstruction_mode'] = reconstruction_mode
+    f.attrs['reconstruction_dtype'] = np.dtype(reconstruction_dtype).str
+    f.attrs['n_z'] = n_z
+    if compression is not None:
+        f.attrs['compression'] = compression
+
+    if digital_phase_mask is not None:
+        save_digital_phase_mask(f, digital_phase_mask)
     return f
 
-def open_hdf5_archive(hdf5_path):
+def open_hdf5_archive(hdf5_path, mode='r+', swmr=False):
     """
     Load and return a shampoo HDF5 archive.
 
@@ -84,11 +235,421 @@ def open_hdf5_archive(hdf5_path):
     ----------
     hdf5_path : string
         Name of HDF5 archive
+    mode : {"r+", "r"}
+        Open for reading and writing, or read only. Default is ``"r+"``.
+    swmr : bool
+        Open a read only archive in single writer, multiple reader (SWMR)
+        mode, to read it while an `~shampoo.store.ArchiveWriter` writes to
+        it. Call ``refresh()`` on a dataset to see the latest writes.
+        Default is False.
 
     Returns
     -------
     f : `~h5py.File`
         Opened HDF5 file
     """
-    return h5py.File(hdf5_path, 'r+')
+    if swmr:
+        if mode != 'r':
+            raise ValueError('Only read only archives can be opened in SWMR '
+                             'mode, use `ArchiveWriter` to write to an '
+                             'archive in SWMR mode.')
+        return h5py.File(hdf5_path, 'r', libver='latest', swmr=True)
+    return h5py.File(hdf5_path, mode)
+
+
+def _slice_dataset(f, name, dtype, z_index, shape):
+    """
+    Get the dataset ``name`` of hologram z-slices of shape ``shape`` in
+    ``f``, with room for slice ``z_index``, creating or growing it as needed.
+
+    Slices are sized by the reconstructions rather than the holograms, since
+    holograms may be cropped or reconstructed at reduced resolution.
+    """
+    if name not in f:
+        n_holograms = len(f['holograms'])
+        rows, cols = shape
+        f.create_dataset(name, dtype=dtype,
+                         shape=(n_holograms, max(f.attrs.get('n_z', 1),
+                                                 z_index + 1), rows, cols),
+                         maxshape=(n_holograms, None, rows, cols),
+                         chunks=(1, 1, rows, cols),
+                         compression=f.attrs.get('compression', None))
+
+    dataset = f[name]
+    if tuple(shape) != dataset.shape[2:]:
+        raise ValueError('Dataset {0} holds slices of shape {1}, got a slice '
+                         'of shape {2}.'.format(name, dataset.shape[2:],
+                                                tuple(shape)))
+    if z_index >= dataset.shape[1]:
+        if dataset.maxshape[1] is not None:
+            raise ValueError('Dataset {0} has room for {1} z-slices, and '
+                             'cannot be resized.'
+                             .format(name, dataset.shape[1]))
+        dataset.resize(z_index + 1, axis=1)
+    return dataset
+
+
+def save_reconstruction(f, hologram_index, z_index, reconstructed_wave,
+                        rois=None):
+    """
+    Store one reconstructed z-slice of a hologram in a shampoo HDF5 archive.
+
+    What is stored depends on the ``reconstruction_mode`` of the archive,
+    see `~shampoo.store.create_hdf5_archive`.
+
+    Parameters
+    ----------
+    f : `~h5py.File`
+        Opened HDF5 archive
+    hologram_index : int
+        Index of the hologram in the ``holograms`` dataset
+    z_index : int
+        Index of the z-slice
+    reconstructed_wave : `~numpy.ndarray` or `~shampoo.reconstruction.ReconstructedWave`
+        Reconstructed wave of the slice
+    rois : list of tuples of slices or None
+        Regions of interest to store, required in the ``"roi"`` mode and
+        ignored otherwise.
+    """
+    wave = getattr(reconstructed_wave, 'reconstructed_wave',
+                   reconstructed_wave)
+    mode = f.attrs.get('reconstruction_mode', 'complex')
+    dtype = f.attrs.get('reconstruction_dtype', np.dtype(np.complex128).str)
+
+    if mode == 'complex':
+        dataset = _slice_dataset(f, 'reconstructed_wavefields', dtype,
+                                 z_index, wave.shape)
+        dataset[hologram_index, z_index, :, :] = wave
+
+    elif mode == 'amplitude_phase':
+        amplitude = _slice_dataset(f, 'reconstructed_amplitude', np.float32,
+                                   z_index, wave.shape)
+        phase = _slice_dataset(f, 'reconstructed_wrapped_phase', np.float32,
+                               z_index, wave.shape)
+        amplitude[hologram_index, z_index, :, :] = np.abs(wave)
+        phase[hologram_index, z_index, :, :] = np.angle(wave)
+
+    else:
+        if rois is None:
+            raise ValueError('Regions of interest are required to save '
+                             'reconstructions in the "roi" mode.')
+        name = 'reconstructed_rois/{0}/{1}'.format(hologram_index, z_index)
+        if name in f:
+            del f[name]
+        group = f.create_group(name)
+        for i, roi in enumerate(rois):
+            stamp = group.create_dataset(str(i), data=wave[roi].astype(dtype))
+            stamp.attrs['origin'] = [roi[0].start, roi[1].start]
+
+
+def load_reconstruction(f, hologram_index, z_index):
+    """
+    Load one reconstructed z-slice of a hologram from a shampoo HDF5 archive.
+
+    Parameters
+    ----------
+    f : `~h5py.File`
+        Opened HDF5 archive
+    hologram_index : int
+        Index of the hologram in the ``holograms`` dataset
+    z_index : int
+        Index of the z-slice
+
+    Returns
+    -------
+    reconstructed_wave : `~numpy.ndarray`, list or None
+        Reconstructed wave of the slice, rebuilt from its amplitude and
+        wrapped phase in the ``"amplitude_phase"`` mode. In the ``"roi"`` mode, a
+        list of ``(roi, stamp)`` pairs instead, where ``roi`` is a tuple of
+        slices. None if no slice with index ``z_index`` or higher was ever
+        saved.
+    """
+    mode = f.attrs.get('reconstruction_mode', 'complex')
+
+    if mode == 'complex':
+        if ('reconstructed_wavefields' not in f or
+                z_index >= f['reconstructed_wavefields'].shape[1]):
+            return None
+        return f['reconstructed_wavefields'][hologram_index, z_index, :, :]
+
+    elif mode == 'amplitude_phase':
+        if ('reconstructed_amplitude' not in f or
+                z_index >= f['reconstructed_amplitude'].shape[1]):
+            return None
+        amplitude = f['reconstructed_amplitude'][hologram_index, z_index]
+        phase = f['reconstructed_wrapped_phase'][hologram_index, z_index]
+        return amplitude * np.exp(1j * phase).astype(np.complex64)
+
+    name = 'reconstructed_rois/{0}/{1}'.format(hologram_index, z_index)
+    if name not in f:
+        return None
+    stamps = []
+    for i in range(len(f[name])):
+        stamp = f[name][str(i)]
+        row, col = stamp.attrs['origin']
+        stamps.append(((slice(row, row + stamp.shape[0]),
+                        slice(col, col + stamp.shape[1])), stamp[...]))
+    return stamps
+
+
+def save_digital_phase_mask(f, digital_phase_mask):
+    """
+    Store a digital phase mask in a shampoo HDF5 archive, replacing any
+    mask stored previously.
+
+    The mask is fit once for an acquisition (for example with
+    `~shampoo.reconstruction.Hologram.fit_digital_phase_mask`), so that later
+    runs can load it with `~shampoo.store.load_digital_phase_mask` rather than
+    fitting it again.
+
+    Parameters
+    ----------
+    f : `~h5py.File`
+        Opened HDF5 archive
+    digital_phase_mask : `~numpy.ndarray`
+        Digital phase mask
+    """
+    if 'digital_phase_mask' in f:
+        del f['digital_phase_mask']
+    f.create_dataset('digital_phase_mask', data=digital_phase_mask)
+
+
+def load_digital_phase_mask(f):
+    """
+    Load the digital phase mask stored in a shampoo HDF5 archive.
+
+    Parameters
+    ----------
+    f : `~h5py.File`
+        Opened HDF5 archive
+
+    Returns
+    -------
+    digital_phase_mask : `~numpy.ndarray` or None
+        Digital phase mask, or None if the archive doesn't have one.
+    """
+    if 'digital_phase_mask' not in f:
+        return None
+    return f['digital_phase_mask'][...]
+
+
+def _archive_writer(hdf5_path, wave_shape, queue, status):
+    """
+    Write the reconstructions from ``queue`` into the archive at
+    ``hdf5_path``, in the writer process of `~shampoo.store.ArchiveWriter`.
+
+    Readiness, and each slice which fails to be written, are reported on
+    ``status``, and the writer carries on with the next slice.
+    """
+    try:
+        f = h5py.File(hdf5_path, 'r+', libver='latest')
+        # No objects can be created in SWMR mode, so create the datasets
+        # for reconstructions before switching to it
+        mode = f.attrs.get('reconstruction_mode', 'complex')
+        dtype = f.attrs.get('reconstruction_dtype',
+                            np.dtype(np.complex128).str)
+        last_z_index = f.attrs.get('n_z', 1) - 1
+        if mode == 'complex':
+            _slice_dataset(f, 'reconstructed_wavefields', dtype, last_z_index,
+                           wave_shape)
+        else:
+            for name in _RECONSTRUCTION_DATASETS[mode]:
+                _slice_dataset(f, name, np.float32, last_z_index, wave_shape)
+        f.swmr_mode = True
+    except Exception as error:
+        status.put(('failed', None, None, _describe_error(error)))
+        raise
+    status.put(('ready', None, None, None))
+
+    try:
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            try:
+                save_reconstruction(f, *item)
+                f.flush()
+            except Exception as error:
+                status.put(('failed', item[0], item[1],
+                            _describe_error(error)))
+    finally:
+        f.close()
+
+
+def _describe_error(error):
+    return '{0}: {1}'.format(type(error).__name__, error)
+
+
+class ArchiveWriter(object):
+    """
+    Single writer process for the reconstructions of a shampoo HDF5 archive.
+
+    Any number of processes put reconstructed slices on a bounded queue,
+    and one writer process takes them from the queue and writes them with
+    `~shampoo.store.save_reconstruction`. The writer holds the archive in
+    single writer, multiple reader (SWMR) mode, so other processes can read
+    the archive at the same time with `~shampoo.store.open_hdf5_archive`
+    and ``swmr=True``.
+
+    Slices which fail to be written are skipped by the writer and recorded
+    in ``failures``, and the next call to `~shampoo.store.ArchiveWriter.put`
+    or `~shampoo.store.ArchiveWriter.close` raises a `RuntimeError`
+    describing them. If the writer process dies, ``put`` and ``close``
+    raise instead of waiting on the queue.
+
+    The archive must not be open for writing elsewhere while the writer
+    runs. Reconstruction datasets are created before switching to SWMR mode,
+    since no objects can be created in SWMR mode, so the ``"roi"``
+    reconstruction mode is not supported. The datasets can still grow along
+    the z axis. Their slices have shape ``wave_shape``, which is required
+    unless the archive already has reconstruction datasets.
+
+    Examples
+    --------
+    >>> with ArchiveWriter('archive.hdf5') as writer:  # doctest: +SKIP
+    ...     writer.put(hologram_index, z_index, reconstructed_wave)
+    """
+    def __init__(self, hdf5_path, wave_shape=None, queue_size=8,
+                 timeout=1.0):
+        """
+        Parameters
+        ----------
+        hdf5_path : str
+            Path to the HDF5 archive, see
+            `~shampoo.store.create_hdf5_archive`
+        wave_shape : tuple or None
+            Shape of the reconstructed waves, which differs from the shape
+            of the holograms for cropped holograms or reduced resolution
+            reconstructions. Default is None, for the shape of the existing
+            reconstruction datasets.
+        queue_size : int
+            Maximum number of slices waiting to be written. Producers block
+            when the queue is full. Default is 8.
+        timeout : float
+            Interval at which blocked calls check that the writer process is
+            still alive [s]. Default is 1.
+        """
+        with h5py.File(hdf5_path, 'r') as f:
+            mode = f.attrs.get('reconstruction_mode', 'complex')
+            if mode == 'roi':
+                raise ValueError('Archives in the "roi" reconstruction mode '
+                                 'cannot be written in SWMR mode.')
+            name = _RECONSTRUCTION_DATASETS[mode][0]
+            if wave_shape is None and name in f:
+                wave_shape = f[name].shape[2:]
+        if wave_shape is None:
+            raise ValueError('The archive has no reconstructions yet, so the '
+                             'shape of the reconstructed waves is required.')
+
+        self.hdf5_path = hdf5_path
+        self.wave_shape = tuple(wave_shape)
+        self.timeout = timeout
+        self.queue = Queue(queue_size)
+        self.failures = []
+        self._n_reported_failures = 0
+        self._status = Queue()
+        self._process = None
+
+    def start(self):
+        """
+        Start the writer process, and wait until the archive is in SWMR mode
+        and can be opened by readers.
+        """
+        self._process = Process(target=_archive_writer,
+                                args=(self.hdf5_path, self.wave_shape,
+                                      self.queue, self._status))
+        self._process.start()
+        while True:
+            try:
+                state, _, _, message = self._status.get(timeout=self.timeout)
+                break
+            except Empty:
+                if not self._process.is_alive():
+                    state, message = 'failed', 'no error was reported'
+                    break
+
+        if state != 'ready':
+            self._process.join()
+            self._process = None
+            raise RuntimeError('The archive writer process failed to start: '
+                               '{0}'.format(message))
+        return self
+
+    def _check_failures(self):
+        """
+        Raise a `RuntimeError` if slices failed to be written since the last
+        check.
+        """
+        while True:
+            try:
+                _, hologram_index, z_index, message = self._status.get_nowait()
+            except Empty:
+                break
+            self.failures.append((hologram_index, z_index, message))
+
+        new_failures = self.failures[self._n_reported_failures:]
+        self._n_reported_failures = len(self.failures)
+        if new_failures:
+            raise RuntimeError(
+                'The archive writer failed to write {0} slice(s): {1}'
+                .format(len(new_failures), '; '.join(
+                    'hologram {0}, z-slice {1}: {2}'.format(*failure)
+                    for failure in new_failures)))
+
+    def _put(self, item):
+        """
+        Put ``item`` on the queue, raising instead of blocking forever if the
+        writer process dies.
+        """
+        while True:
+            if self._process is None or not self._process.is_alive():
+                raise RuntimeError('The archive writer process is not '
+                                   'running.')
+            try:
+                self.queue.put(item, timeout=self.timeout)
+                return
+            except Full:
+                pass
+
+    def put(self, hologram_index, z_index, reconstructed_wave):
+        """
+        Queue a reconstructed slice to be written, see
+        `~shampoo.store.save_reconstruction`.
+
+        Producers in other processes can instead put
+        ``(hologram_index, z_index, reconstructed_wave)`` tuples on
+        ``queue`` directly, with ``queue`` passed to them when they are
+        started. Failures to write their slices are reported to the process
+        which owns the writer.
+        """
+        self._check_failures()
+        wave = getattr(reconstructed_wave, 'reconstructed_wave',
+                       reconstructed_wave)
+        self._put((hologram_index, z_index, wave))
+
+    def close(self):
+        """
+        Write all queued slices, and stop the writer process.
+        """
+        if self._process is None:
+            return
+        try:
+            if self._process.is_alive():
+                self._put(None)
+        finally:
+            process, self._process = self._process, None
+            process.join()
+            if process.exitcode != 0:
+                # Nothing reads the queue anymore, so don't wait on it to
+                # flush when this process exits
+                self.queue.cancel_join_thread()
+        self._check_failures()
+        if process.exitcode != 0:
+            raise RuntimeError('The archive writer process failed, with exit '
+                               'code {0}.'.format(process.exitcode))
+
+    def __enter__(self):
+        return self.start()
 
+    def __exit__(self, *exc_info):
+        self.close()
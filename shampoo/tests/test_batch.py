@@ -0,0 +1,97 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+
+import numpy as np
+import h5py
+import pytest
+
+from .. import batch
+from ..batch import (process_archive, completed_holograms, main,
+                     _save_specimens)
+from ..store import open_hdf5_archive
+from ..reconstruction import transfer_function_cache
+
+
+def test_process_archive_resumes(tmpdir):
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    rng = np.random.RandomState(42)
+    with h5py.File(hdf5_path, 'w') as f:
+        f.create_dataset('holograms',
+                         data=1000 + 0.01 * rng.randn(3, 128, 128))
+
+    # Pretend an earlier run was killed after completing hologram 1
+    f = open_hdf5_archive(hdf5_path)
+    _save_specimens(f, 1, np.ones((2, 4)))
+    np.testing.assert_array_equal(completed_holograms(f),
+                                  [False, True, False])
+    f.close()
+
+    kwargs = dict(n_coarse=3, processes=1, progress=False,
+                  autofocus_kwargs=dict(detect_kwargs=dict(margin=50)))
+    max_bytes = transfer_function_cache.max_bytes
+    assert process_archive(hdf5_path, 0.05, 0.06, **kwargs) == 2
+    # The cache budget of this process is left unchanged
+    assert transfer_function_cache.max_bytes == max_bytes
+
+    f = open_hdf5_archive(hdf5_path)
+    assert completed_holograms(f).all()
+    assert all(f['specimens/{0}'.format(i)].shape[1] == 4 for i in range(3))
+    # The completed hologram was not processed again
+    np.testing.assert_array_equal(f['specimens/1'][...], np.ones((2, 4)))
+    f.close()
+
+    # Nothing is left to do
+    assert process_archive(hdf5_path, 0.05, 0.06, **kwargs) == 0
+    main([hdf5_path, '0.05', '0.06', '--processes', '1', '--cache-mb', '64'])
+
+
+def test_process_archive_resumes_with_workers(tmpdir, monkeypatch):
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    rng = np.random.RandomState(42)
+    holograms = 1000 + 0.01 * rng.randn(5, 128, 128)
+    with h5py.File(hdf5_path, 'w') as f:
+        f.create_dataset('holograms', data=holograms)
+
+    # Interrupt the run after two holograms are written, with more queued
+    save_specimens = batch._save_specimens
+    n_saved = []
+
+    def interrupted_save(f, index, specimens):
+        if len(n_saved) == 2:
+            raise KeyboardInterrupt
+        save_specimens(f, index, specimens)
+        n_saved.append(index)
+    monkeypatch.setattr(batch, '_save_specimens', interrupted_save)
+
+    kwargs = dict(n_coarse=3, processes=2, queue_size=4, progress=False,
+                  autofocus_kwargs=dict(detect_kwargs=dict(margin=50)))
+    with pytest.raises(KeyboardInterrupt):
+        process_archive(hdf5_path, 0.05, 0.06, **kwargs)
+
+    f = open_hdf5_archive(hdf5_path)
+    np.testing.assert_array_equal(completed_holograms(f),
+                                  [True, True, False, False, False])
+    f.close()
+
+    # Resuming processes the remaining holograms only
+    monkeypatch.setattr(batch, '_save_specimens', save_specimens)
+    assert process_archive(hdf5_path, 0.05, 0.06, **kwargs) == 3
+
+    # Same results as an uninterrupted run
+    other_path = os.path.join(str(tmpdir), 'other.hdf5')
+    with h5py.File(other_path, 'w') as f:
+        f.create_dataset('holograms', data=holograms)
+    kwargs['processes'] = 1
+    assert process_archive(other_path, 0.05, 0.06, **kwargs) == 5
+
+    f = open_hdf5_archive(hdf5_path)
+    other = open_hdf5_archive(other_path)
+    assert completed_holograms(f).all()
+    for i in range(5):
+        name = 'specimens/{0}'.format(i)
+        np.testing.assert_allclose(f[name][...], other[name][...])
+    f.close()
+    other.close()
+
@@ -0,0 +1,147 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+
+from .. import focus
+from ..focus import (locate_specimens, locate_specimens_stream, refine_focus,
+                     focus_metrics, autofocus_specimens, FOCUS_METRICS,
+                     _stack_roi_cubes)
+from ..reconstruction import ReconstructedWave, WaveWindow, unwrap_phase
+
+
+def _smooth_wave_cube(shape):
+    z, x, y = np.ogrid[0:shape[0], -1:1:shape[1]*1j, -1:1:shape[2]*1j]
+    return ((1.5 + np.cos(z/3 + 10*x + 20*y)) *
+            np.exp(0.3j*np.sin(z/2 + 10*x*y)))
+
+
+def test_locate_specimens_stream():
+    # Smooth waves, since the unwrapped phase of noise is not reproducible
+    distances = np.linspace(0.09, 0.14, 20)
+    wave_cube = _smooth_wave_cube((len(distances), 64, 64))
+
+    # One cluster of detections around (30, 35), and one noise point
+    positions = np.array([[30, 35, distances[i]] for i in range(8, 13)] +
+                         [[10, 10, distances[2]]], dtype=float)
+    labels = np.array([0, 0, 0, 0, 0, -1])
+
+    coords, significance = locate_specimens(wave_cube, positions, labels,
+                                            distances)
+    waves = (ReconstructedWave(wave) for wave in wave_cube)
+    stream_coords, stream_significance = locate_specimens_stream(
+        waves, positions, labels, distances)
+
+    assert coords.shape == (1, 3)
+    np.testing.assert_allclose(stream_coords, coords)
+    np.testing.assert_allclose(stream_significance, significance)
+
+
+class _DefocusedSpecimen(object):
+    """
+    Stand-in for a hologram of a specimen in focus at ``focus_distance``,
+    which counts its reconstructions.
+    """
+    def __init__(self, focus_distance):
+        self.focus_distance = focus_distance
+        self.n_reconstructions = 0
+
+    def reconstruct_wave(self, propagation_distance):
+        self.n_reconstructions += 1
+        defocus = (propagation_distance - self.focus_distance) / 1e-3
+        wave = np.ones((32, 32), dtype=complex)
+        wave[12:20, 12:20] = 0.5 + np.arctan(defocus**2)
+        return wave
+
+
+def test_refine_focus():
+    hologram = _DefocusedSpecimen(focus_distance=0.1123)
+    roi = (slice(8, 24), slice(8, 24))
+
+    focus_distance = refine_focus(hologram, roi, (0.105, 0.12), xtol=1e-6)
+    assert abs(focus_distance - hologram.focus_distance) < 1e-5
+
+    # Far fewer reconstructions than a grid with the same precision
+    assert hologram.n_reconstructions < 30
+
+
+class _CoarseSpecimens(object):
+    """
+    Stand-in for a hologram with specimens detected at ``centers``, whose
+    focus lies ``offset`` beyond the coarse focus. The waves of the coarse
+    grid are filled with their propagation distance, and it has no method
+    to reconstruct a full-frame wave at a single distance.
+    """
+    n = 64
+
+    def __init__(self, centers, offset):
+        self.centers = centers
+        self.offset = offset
+        self.reference_windows = []
+
+    def iter_reconstructions(self, distances):
+        for distance in distances:
+            yield ReconstructedWave(np.full((self.n, self.n), distance,
+                                            dtype=complex))
+
+    def detect_specimens(self, wave, distance, margin=0):
+        return np.array([[x, y, distance] for x, y in self.centers])
+
+    def reconstruct_roi(self, reference_wave, reference_distance,
+                        propagation_distances, roi, padding=32):
+        self.reference_windows.append(reference_wave)
+        assert np.all(reference_wave.window == reference_distance)
+        defocus = (propagation_distances[0] - reference_distance -
+                   self.offset) / 1e-3
+        return [np.full((4, 4), 1 + defocus**2)]
+
+
+def test_autofocus_specimens(monkeypatch):
+    distances = np.linspace(0.05, 0.06, 5)
+    hologram = _CoarseSpecimens([(16, 16), (48, 48), (16, 48)], offset=1e-3)
+
+    # Two specimens share a coarse focus
+    coarse_foci = distances[[1, 3, 1]]
+
+    def coarse_focus(waves, positions, labels, distances):
+        for wave in waves:
+            pass
+        coords = np.array([[x, y, z] for (x, y), z in
+                           zip(hologram.centers, coarse_foci)], dtype=float)
+        return coords, np.ones(len(coords))
+    monkeypatch.setattr(focus, 'locate_specimens_stream', coarse_focus)
+
+    coords, significance = autofocus_specimens(
+        hologram, distances[0], distances[-1], n_coarse=len(distances),
+        xtol=1e-6, detect_kwargs=dict(margin=5))
+    np.testing.assert_allclose(coords[:, 2], coarse_foci + 1e-3, atol=1e-5)
+
+    # Specimens are refined from the windows kept at their coarse focus
+    assert len(hologram.reference_windows) > 0
+    for window in hologram.reference_windows:
+        assert isinstance(window, WaveWindow)
+
+
+def test_focus_metrics():
+    roi_cube = _smooth_wave_cube((6, 12, 10))
+    metrics = focus_metrics(roi_cube)
+    assert sorted(metrics) == sorted(FOCUS_METRICS)
+    for metric in metrics.values():
+        assert metric.shape == (6,)
+
+    # The vectorized unwrap agrees with scikit-image for smooth phases
+    integral_phase_wave = np.sum([unwrap_phase(roi_wave)
+                                  for roi_wave in roi_cube], axis=(1, 2))
+    np.testing.assert_allclose(metrics['phase'], integral_phase_wave,
+                               atol=1e-12)
+
+    # Zero-padding ROI cubes into one stack doesn't change their metrics
+    other_roi_cube = _smooth_wave_cube((4, 7, 9))
+    roi_stack, mask = _stack_roi_cubes([roi_cube, other_roi_cube])
+    stacked_metrics = focus_metrics(roi_stack, mask=mask)
+    other_metrics = focus_metrics(other_roi_cube)
+    for name in FOCUS_METRICS:
+        np.testing.assert_allclose(stacked_metrics[name][0], metrics[name],
+                                   atol=1e-12)
+        np.testing.assert_allclose(stacked_metrics[name][1, :4],
+                                   other_metrics[name], atol=1e-12)
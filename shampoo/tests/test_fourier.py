@@ -0,0 +1,128 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+
+import numpy as np
+import pytest
+
+from .. import fourier
+from ..fourier import (ScipyFFTBackend, NumpyFFTBackend, PyFFTWBackend,
+                       set_fft_backend, get_fft_backend, save_fftw_wisdom,
+                       load_fftw_wisdom, fft2, ifft2)
+
+try:
+    import pyfftw
+    HAS_PYFFTW = True
+except ImportError:
+    HAS_PYFFTW = False
+
+
+def _check_backend(backend):
+    image = np.random.randn(64, 64) + 1j*np.random.randn(64, 64)
+    np.testing.assert_allclose(backend.fft2(image), np.fft.fft2(image))
+    np.testing.assert_allclose(backend.ifft2(image), np.fft.ifft2(image))
+    np.testing.assert_allclose(backend.fftn(image), np.fft.fftn(image))
+    np.testing.assert_allclose(backend.ifftn(image), np.fft.ifftn(image))
+
+    real_image = image.real[:, :63]
+    np.testing.assert_allclose(backend.rfft2(real_image),
+                               np.fft.rfft2(real_image))
+    np.testing.assert_allclose(backend.irfft2(backend.rfft2(real_image),
+                                              real_image.shape), real_image)
+
+    # Results are written into out, if given
+    out = np.empty_like(image)
+    assert backend.fft2(image, out=out) is out
+    np.testing.assert_allclose(out, np.fft.fft2(image))
+
+
+def test_scipy_backend():
+    _check_backend(ScipyFFTBackend(threads=2))
+
+
+def test_numpy_backend():
+    _check_backend(NumpyFFTBackend())
+
+
+@pytest.mark.skipif('not HAS_PYFFTW')
+def test_pyfftw_backend(tmpdir, monkeypatch):
+    # Restore the wisdom state of the process after loading wisdom below
+    monkeypatch.setattr(fourier, '_wisdom_loaded', False)
+    backend = PyFFTWBackend(threads=2, planner_effort='FFTW_ESTIMATE')
+    _check_backend(backend)
+
+    # Repeated transforms must not share the plan's output buffer
+    image = np.random.randn(64, 64)
+    first = backend.fft2(image)
+    second = backend.fft2(2 * image)
+    np.testing.assert_allclose(2 * first, second)
+
+    wisdom_path = os.path.join(str(tmpdir), 'wisdom.pkl')
+    save_fftw_wisdom(wisdom_path)
+    load_fftw_wisdom(wisdom_path)
+
+
+@pytest.mark.skipif('not HAS_PYFFTW')
+def test_pyfftw_plans(tmpdir, monkeypatch):
+    monkeypatch.setattr(fourier, '_wisdom_loaded', False)
+    backend = PyFFTWBackend(max_plans=3)
+
+    # Plans are only measured once wisdom has been loaded
+    assert backend.planner_effort == 'FFTW_ESTIMATE'
+    wisdom_path = os.path.join(str(tmpdir), 'wisdom.pkl')
+    save_fftw_wisdom(wisdom_path)
+    load_fftw_wisdom(wisdom_path)
+    assert backend.planner_effort == 'FFTW_MEASURE'
+    monkeypatch.setattr(fourier, '_wisdom_loaded', False)
+
+    # Each thread keeps the most recently used plans only
+    for size in [8, 10, 12, 8, 14]:
+        image = np.random.randn(size, size)
+        np.testing.assert_allclose(backend.fft2(image), np.fft.fft2(image))
+    assert [key[1] for key in backend._local.plans] == [(12, 12), (8, 8),
+                                                        (14, 14)]
+
+
+@pytest.mark.skipif('not HAS_PYFFTW')
+def test_pyfftw_no_copies():
+    backend = PyFFTWBackend(planner_effort='FFTW_ESTIMATE')
+    image = pyfftw.empty_aligned((64, 64), dtype=np.complex128)
+    image[...] = np.random.randn(64, 64) + 1j*np.random.randn(64, 64)
+
+    # Aligned outputs are written by FFTW directly
+    out = pyfftw.empty_aligned((64, 64), dtype=np.complex128)
+    assert backend.fft2(image, out=out) is out
+    np.testing.assert_allclose(out, np.fft.fft2(image))
+
+    # Outputs which don't suit the plan get a copy of the result
+    strided_out = np.empty((64, 128), dtype=np.complex128)[:, ::2]
+    assert backend.ifft2(image, out=strided_out) is strided_out
+    np.testing.assert_allclose(strided_out, np.fft.ifft2(image))
+
+    # Plans don't keep references to the arrays of the caller
+    fftw = backend._local.plans[('fft2', (64, 64), image.dtype.str, None)][0]
+    assert not np.shares_memory(fftw.input_array, image)
+    assert not np.shares_memory(fftw.output_array, out)
+
+    # Inverse real transforms don't overwrite their input
+    spectrum = np.fft.rfft2(image.real)
+    spectrum_copy = spectrum.copy()
+    np.testing.assert_allclose(backend.irfft2(spectrum, image.shape),
+                               image.real)
+    np.testing.assert_array_equal(spectrum, spectrum_copy)
+
+
+def test_set_fft_backend():
+    previous_backend = get_fft_backend()
+    try:
+        backend = set_fft_backend('numpy')
+        assert get_fft_backend() is backend
+
+        image = np.random.randn(32, 32)
+        np.testing.assert_allclose(ifft2(fft2(image)), image, atol=1e-12)
+
+        with pytest.raises(ValueError):
+            set_fft_backend('not_a_backend')
+    finally:
+        set_fft_backend(previous_backend)
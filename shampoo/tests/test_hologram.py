@@ -1,10 +1,20 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+from .. import reconstruction
 from ..reconstruction import (Hologram, rebin_image, _find_peak_centroid,
-                              RANDOM_SEED, _crop_image, CropEfficiencyWarning)
+                              RANDOM_SEED, _crop_image, CropEfficiencyWarning,
+                              TransferFunctionCache, gaussian_smooth,
+                              shift_peak, _signed_blob_doh,
+                              KernelConvolution, _roi_window, unwrap_phase,
+                              WaveWindow)
+from ..fourier import fft2, ifft2
 
 import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+from skimage.feature import blob_doh
+from skimage.io import imsave
 np.random.seed(RANDOM_SEED)
 
 
@@ -45,6 +55,26 @@ def test_centroid():
     assert np.all(test_image[centroid] == np.max(test_image))
 
 
+def test_fourier_peak_centroid_first_half():
+    np.random.seed(42)
+    holo = Hologram(_off_axis_hologram(dim=256))
+    F_hologram = fft2(holo.apodized_hologram)
+    x_peak, y_peak = holo.fourier_peak_centroid(F_hologram)
+    assert x_peak < holo.n/2
+
+    # Dim the spike in the first half, so that the brightest spike is the
+    # one in the second half, which is mirrored back to the first half
+    dimmed = F_hologram.copy()
+    dimmed[:holo.n//2] *= 0.5
+    margin = int(0.1*holo.n)
+    brightest = _find_peak_centroid(np.abs(dimmed)[margin:-margin,
+                                                   margin:-margin]) + margin
+    assert brightest[0] > holo.n/2
+
+    np.testing.assert_allclose(holo.fourier_peak_centroid(dimmed),
+                               [x_peak, y_peak], atol=1)
+
+
 def test_crop_image():
     # Even number rows/cols
     image1 = np.arange(1024).reshape((32, 32))
@@ -63,18 +93,488 @@ def test_multiple_reconstructions():
     """
     At commit cc730bd and earlier, the Hologram.apodize function modified
     the Hologram.hologram array every time Hologram.reconstruct was called.
-    This tests that that should not happen anymore.
+    Now the raw hologram is never modified, and the apodized hologram is
+    computed once and cached as a separate, read-only array.
     """
     holo = Hologram(_example_hologram())
     h_raw = holo.hologram.copy()
     w1 = holo.reconstruct(0.5)
-    h_apodized1 = holo.hologram.copy()
+    h_apodized1 = holo.apodized_hologram.copy()
     w2 = holo.reconstruct(0.8)
-    h_apodized2 = holo.hologram.copy()
 
-    # check hologram gets modified in place first time
+    # check hologram doesn't get modified in place
+    assert np.all(holo.hologram == h_raw)
     assert not np.all(h_raw == h_apodized1)
 
-    # check hologram doesn't get modified again
-    assert np.all(h_apodized1 == h_apodized2)
+    # check the apodized hologram is cached and read-only
+    assert np.all(holo.apodized_hologram == h_apodized1)
+    assert not holo.apodized_hologram.flags.writeable
+
+
+def test_reconstruct_multithread():
+    holo = Hologram(_off_axis_hologram(dim=128))
+    distances = np.linspace(0.09, 0.14, 8)
+
+    # All threads share one apodization and one digital phase mask fit
+    wave_cube = holo.reconstruct_multithread(distances, threads=4)
+    np.testing.assert_allclose(wave_cube, holo.reconstruct_stack(distances))
+
+    # The mask is fit at the median distance whichever thread runs first, so
+    # fresh holograms agree with `reconstruct_stack`
+    hologram = _off_axis_hologram(dim=128)
+    for i in range(3):
+        wave_cube = Hologram(hologram).reconstruct_multithread(distances,
+                                                               threads=4)
+        expected = Hologram(hologram).reconstruct_stack(distances)
+        np.testing.assert_allclose(wave_cube, expected, rtol=1e-6,
+                                   atol=1e-6 * np.abs(expected).max())
+
+
+def test_reconstruct_stack():
+    holo = Hologram(_example_hologram(dim=256))
+    distances = [0.5, 0.8]
+
+    wave_cube = holo.reconstruct_stack(distances)
+    assert wave_cube.shape == (len(distances), holo.n, holo.n)
+
+    # With a common digital phase mask, the stack should match the
+    # single-distance reconstructions
+    digital_phase_mask = np.exp(1j * np.random.rand(holo.n, holo.n))
+    wave_cube = holo.reconstruct_stack(distances, digital_phase_mask)
+
+    for i, distance in enumerate(distances):
+        wave = holo.reconstruct_wave(distance, digital_phase_mask)
+        np.testing.assert_allclose(wave_cube[i], wave)
+
+
+def test_transfer_function_cache():
+    G_size = 64 * 64 * np.dtype(np.complex128).itemsize
+    cache = TransferFunctionCache(max_bytes=2 * G_size)
+    for key in range(3):
+        cache.set(key, np.zeros((64, 64), dtype=np.complex128))
+
+    # Newest entry is evicted to stay within the memory budget
+    assert 0 in cache and 1 not in cache and 2 in cache
+    assert cache.nbytes == 2 * G_size
+
+    # Getting an entry marks it as recently used
+    cache.get(0)
+    cache.set(3, np.zeros((64, 64), dtype=np.complex128))
+    assert 0 not in cache and 2 in cache and 3 in cache
+
+    # Repeated sweeps longer than the cache still hit it
+    cache = TransferFunctionCache(max_bytes=4 * G_size)
+    hits = []
+    for sweep in range(3):
+        hits.append(0)
+        for key in range(10):
+            if cache.get(key) is not None:
+                hits[-1] += 1
+            else:
+                cache.set(key, np.zeros((64, 64), dtype=np.complex128))
+    assert hits == [0, 4, 4]
+
+    # Holograms with the same geometry share the cached arrays
+    holo1 = Hologram(_example_hologram(dim=64))
+    holo2 = Hologram(_example_hologram(dim=64))
+    G1 = holo1.fourier_trans_of_impulse_resp_func(0.5)
+    G2 = holo2.fourier_trans_of_impulse_resp_func(0.5)
+    assert G1 is G2
+    assert not G1.flags.writeable
+
+
+def test_separable_transfer_function():
+    holo = Hologram(_example_hologram(dim=256))
+    propagation_distance = 0.1
+
+    # Evaluate Eqn 3.22 of Schnars & Juptner (2002) directly on the full grid
+    x, y = np.mgrid[0:holo.n, 0:holo.n] - holo.n/2
+    first_term = (holo.wavelength**2 * (x + holo.n**2 * holo.dx**2 /
+                  (2.0 * propagation_distance * holo.wavelength))**2 /
+                  (holo.n**2 * holo.dx**2))
+    second_term = (holo.wavelength**2 * (y + holo.n**2 * holo.dy**2 /
+                   (2.0 * propagation_distance * holo.wavelength))**2 /
+                   (holo.n**2 * holo.dy**2))
+    G_full_grid = np.exp(-1j * holo.wavenumber * propagation_distance *
+                         np.sqrt(1.0 - first_term - second_term))
+
+    G = holo.fourier_trans_of_impulse_resp_func(propagation_distance)
+    np.testing.assert_allclose(G, G_full_grid, atol=1e-8)
+
+    G64 = holo.fourier_trans_of_impulse_resp_func(propagation_distance,
+                                                  dtype=np.complex64)
+    assert G64.dtype == np.complex64
+    assert np.max(np.abs(np.angle(G64 / G_full_grid))) < 1e-6
+
+
+def test_real_image_mask():
+    holo = Hologram(_example_hologram(dim=128))
+    assert 'mgrid' not in vars(holo)
+
+    # Compare with the mask built on the dense grid
+    center_x, center_y, radius = 30, 100, 25
+    x, y = np.mgrid[0:holo.n, 0:holo.n]
+    mask_dense = np.zeros((holo.n, holo.n))
+    mask_dense[(x-center_x)**2 + (y-center_y)**2 < radius**2] = 1.0
+    buffer = 20
+    mask_dense[(x < buffer) | (y < buffer) |
+               (x > len(x) - buffer) | (y > len(y) - buffer)] = 0.0
+
+    mask = holo.real_image_mask(center_x, center_y, radius)
+    assert np.all(mask == mask_dense)
+
+
+def test_digital_phase_mask_cache():
+    holo = Hologram(_example_hologram(dim=256))
+    assert holo.digital_phase_mask is None
+
+    # The mask is fit on the first reconstruction and reused afterwards
+    holo.reconstruct(0.5)
+    digital_phase_mask = holo.digital_phase_mask
+    assert digital_phase_mask.shape == holo.hologram.shape
+    holo.reconstruct(0.8)
+    assert holo.digital_phase_mask is digital_phase_mask
+
+    holo.invalidate_digital_phase_mask()
+    assert holo.digital_phase_mask is None
+
+    # A mask from a calibration hologram can be shared
+    other_holo = Hologram(_example_hologram(dim=256),
+                          digital_phase_mask=digital_phase_mask)
+    assert other_holo.digital_phase_mask is digital_phase_mask
+    other_holo.reconstruct(0.5)
+    assert other_holo.digital_phase_mask is digital_phase_mask
+
+    with pytest.raises(ValueError):
+        Hologram(_example_hologram(dim=128),
+                 digital_phase_mask=digital_phase_mask)
+
+
+@pytest.mark.parametrize(('method', 'sigma', 'tolerance'),
+                         [('fft', 10, 1e-4), ('fft', 50, 1e-4),
+                          ('downsample', 12, 1e-3), ('downsample', 50, 1e-3),
+                          ('auto', 3, 1e-12), ('auto', 50, 1e-3)])
+def test_gaussian_smooth(method, sigma, tolerance):
+    x, y = np.mgrid[0:512, 0:512]
+    image = (3*np.sin(x/150.) + 2*np.cos(y/90.) + 0.002*x +
+             0.5*np.random.randn(512, 512))
+
+    smoothed_image = gaussian_smooth(image, sigma, method=method)
+    expected = gaussian_filter(image, sigma)
+    assert smoothed_image.shape == image.shape
+    assert (np.max(np.abs(smoothed_image - expected)) <
+            tolerance * np.ptp(expected))
+
+    with pytest.raises(ValueError):
+        gaussian_smooth(image, sigma, method='not_a_method')
+
+
+def _off_axis_hologram(dim=512):
+    """
+    Generate an off-axis hologram of a weak phase object seen through
+    optics with a quadratic phase aberration.
+    """
+    x, y = np.mgrid[0:dim, 0:dim] - dim/2
+    aberration = 2e-5*(x**2 + 0.7*y**2) + 1e-5*x*y
+    specimen = 0.3*np.exp(-((x - 50)**2 + (y + 80)**2)/200)
+    object_wave = np.exp(1j*(aberration + specimen))
+    reference_wave = np.exp(2j*np.pi*(0.23*x + 0.19*y))
+    return (500*np.abs(object_wave + reference_wave)**2 +
+            np.random.randn(dim, dim))
+
+
+@pytest.mark.parametrize("binning, tolerance", [(2, 0.01), (4, 0.02)])
+def test_binned_digital_phase_mask(monkeypatch, binning, tolerance):
+    np.random.seed(RANDOM_SEED)
+    holo = Hologram(_off_axis_hologram())
+    apodized_hologram, F_hologram, x_peak, y_peak = \
+        holo._real_image_spectrum()
+    G = holo.fourier_trans_of_impulse_resp_func(0.1)
+    psi = holo._masked_shifted_spectrum(F_hologram, x_peak, y_peak) * G
+
+    # Record the number of pixels unwrapped by each fit
+    unwrapped_sizes = []
+
+    def _unwrap_phase(reconstructed_wave):
+        unwrapped_sizes.append(reconstructed_wave.size)
+        return unwrap_phase(reconstructed_wave)
+
+    monkeypatch.setattr(reconstruction, 'unwrap_phase', _unwrap_phase)
+    full_resolution_mask = holo.get_digital_phase_mask(psi)
+    binned_mask = holo.get_digital_phase_mask(psi, binning=binning)
+    assert unwrapped_sizes == [holo.n**2, holo.n**2 // binning**2]
+
+    # Masks should agree up to a constant phase
+    ratio = binned_mask / full_resolution_mask
+    phase_difference = np.angle(ratio * np.exp(-1j*np.angle(ratio.mean())))
+    assert np.sqrt(np.mean(phase_difference**2)) < tolerance
+
+
+@pytest.mark.parametrize(('dim', 'center', 'radius'),
+                         [(128, (30, 100), 25), (256, (60, 190), 150.)])
+def test_masked_shifted_spectrum(dim, center, radius):
+    holo = Hologram(_example_hologram(dim=dim))
+    holo._mask_radius = lambda: radius
+    F_hologram = np.random.randn(dim, dim) + 1j*np.random.randn(dim, dim)
+
+    mask = holo.real_image_mask(center[0], center[1], radius)
+    expected = shift_peak(F_hologram * mask, [dim/2 - center[0],
+                                              dim/2 - center[1]])
+    shifted_F_hologram = holo._masked_shifted_spectrum(F_hologram, *center)
+    assert np.all(shifted_F_hologram == expected)
+
+
+def test_crop_to_sideband():
+    holo = Hologram(_off_axis_hologram(dim=256))
+    holo._mask_radius = lambda: 30.
+    assert holo.sideband_size == 64
+    assert holo.pixel_size(crop_to_sideband=True) == (4*holo.dx, 4*holo.dy)
+
+    digital_phase_mask = np.exp(1j * np.random.rand(holo.n, holo.n))
+    full_resolution_wave = holo.reconstruct_wave(0.1, digital_phase_mask)
+    cropped_wave = holo.reconstruct_wave(0.1, digital_phase_mask,
+                                         crop_to_sideband=True)
+
+    # The sideband is band-limited, so the cropped reconstruction samples
+    # the full resolution reconstruction on a coarser grid
+    np.testing.assert_allclose(cropped_wave, full_resolution_wave[::4, ::4],
+                               atol=1e-8 * np.abs(full_resolution_wave).max())
+
+    wave_cube = holo.reconstruct_stack([0.1, 0.2], digital_phase_mask,
+                                       crop_to_sideband=True)
+    np.testing.assert_allclose(wave_cube[0], cropped_wave)
+
+    wave = holo.reconstruct(0.1, crop_to_sideband=True)
+    assert wave.reconstructed_wave.shape == (64, 64)
+    assert wave.dx == 4*holo.dx
+
+
+@pytest.mark.parametrize('shifts_xy', [(0, 0), (3, -5), (64, 17.0), (-130, 300)])
+def test_shift_peak(shifts_xy):
+    arr = np.random.randn(128, 96) + 1j*np.random.randn(128, 96)
+    expected = np.roll(np.roll(arr, int(shifts_xy[0]), axis=0),
+                       int(shifts_xy[1]), axis=1)
+    assert np.all(shift_peak(arr, shifts_xy) == expected)
+
+    out = np.empty_like(arr)
+    assert shift_peak(arr, shifts_xy, out=out) is out
+    assert np.all(out == expected)
+
+
+def test_reconstruct_wave_recentering():
+    holo = Hologram(_off_axis_hologram(dim=256))
+    digital_phase_mask = np.exp(1j * np.random.rand(holo.n, holo.n))
+    wave = holo.reconstruct_wave(0.1, digital_phase_mask)
+
+    # Reconstruct with explicit rolls to recenter the spectrum and the wave
+    apodized_hologram, F_hologram, x_peak, y_peak = \
+        holo._real_image_spectrum()
+    mask = holo.real_image_mask(x_peak, y_peak, holo._mask_radius())
+    G = holo.fourier_trans_of_impulse_resp_func(0.1)
+    psi = G * shift_peak(fft2(apodized_hologram * digital_phase_mask) * mask,
+                         [holo.n/2 - x_peak, holo.n/2 - y_peak])
+    expected = shift_peak(ifft2(psi), [holo.n/2, holo.n/2])
+    np.testing.assert_allclose(wave, expected,
+                               atol=1e-10 * np.abs(expected).max())
+
+
+def test_reconstruct_multiprocess():
+    holo = Hologram(_off_axis_hologram(dim=128))
+    distances = np.linspace(0.09, 0.14, 5)
+
+    wave_cube = holo.reconstruct_multiprocess(distances, processes=2,
+                                              chunk_size=2)
+    np.testing.assert_allclose(wave_cube, holo.reconstruct_stack(distances))
+
+
+@pytest.mark.parametrize('read_ahead', [0, 2])
+def test_iter_reconstructions(read_ahead):
+    holo = Hologram(_off_axis_hologram(dim=128))
+    distances = np.linspace(0.09, 0.14, 5)
+    wave_cube = holo.reconstruct_stack(distances)
+
+    waves = list(holo.iter_reconstructions(distances, read_ahead=read_ahead))
+    assert len(waves) == len(distances)
+    for i, wave in enumerate(waves):
+        np.testing.assert_allclose(wave.reconstructed_wave, wave_cube[i])
+
+
+def test_single_precision():
+    np.random.seed(42)
+    hologram = _off_axis_hologram(dim=256)
+    digital_phase_mask = np.exp(2j*np.pi*np.random.rand(256, 256))
+    distances = [0.1, 0.12]
+
+    holo64 = Hologram(hologram, digital_phase_mask=digital_phase_mask)
+    holo32 = Hologram(hologram, dtype=np.float32,
+                      digital_phase_mask=digital_phase_mask)
+    assert holo32.hologram.dtype == np.float32
+    assert holo32.digital_phase_mask.dtype == np.complex64
+    assert holo32.fourier_trans_of_impulse_resp_func(0.1).dtype == np.complex64
+
+    wave_cube64 = holo64.reconstruct_stack(distances)
+    wave_cube32 = holo32.reconstruct_stack(distances)
+    assert wave_cube32.dtype == np.complex64
+    assert holo32.reconstruct(0.1).reconstructed_wave.dtype == np.complex64
+
+    # Relative RMS error of the single precision reconstructions
+    for wave32, wave64 in zip(wave_cube32, wave_cube64):
+        error = np.sqrt(np.mean(np.abs(wave32 - wave64)**2) /
+                        np.mean(np.abs(wave64)**2))
+        assert error < 1e-5
+
+
+def test_reconstruct_roi():
+    np.random.seed(42)
+    holo = Hologram(_off_axis_hologram(dim=512))
+    holo.fit_digital_phase_mask(0.1)
+    roi = (slice(296, 316), slice(166, 186))
+    distances = [0.098, 0.1, 0.102]
+
+    reference_wave = holo.reconstruct(0.1)
+    roi_cube = holo.reconstruct_roi(reference_wave, 0.1, distances, roi)
+
+    for roi_wave, distance in zip(roi_cube, distances):
+        expected = holo.reconstruct_wave(distance)[roi]
+        error = np.sqrt(np.mean(np.abs(roi_wave - expected)**2) /
+                        np.mean(np.abs(expected)**2))
+        assert error < 5e-3
+
+    # Propagating from a window of the wave gives the same ROI waves
+    wave_window = WaveWindow(reference_wave, roi)
+    np.testing.assert_array_equal(
+        holo.reconstruct_roi(wave_window, 0.1, distances, roi), roi_cube)
+    with pytest.raises(ValueError):
+        holo.reconstruct_roi(wave_window, 0.1, distances,
+                             (slice(0, 20), slice(166, 186)))
+
+
+def test_signed_blob_doh(monkeypatch):
+    # Bright and dark blobs on a noisy background
+    rng = np.random.RandomState(RANDOM_SEED)
+    image = 0.03 * gaussian_filter(rng.randn(256, 256), 1.5)
+    y, x = np.mgrid[:256, :256]
+    for x0, y0, amplitude in [(60, 70, 1), (180, 60, -1), (120, 190, 1),
+                              (200, 200, -1)]:
+        image += amplitude * np.exp(-((x - x0)**2 + (y - y0)**2) / (2 * 4**2))
+
+    kwargs = dict(threshold=0.00007, min_sigma=2, max_sigma=10)
+    blobs = blob_doh(image, **kwargs)
+    negative_image = -image
+    negative_image += np.median(image) - np.median(negative_image)
+    negative_blobs = blob_doh(negative_image, **kwargs)
+
+    signed_blobs = _signed_blob_doh(image, **kwargs)
+    assert len(blobs) > 0 and len(negative_blobs) > 0
+    np.testing.assert_array_equal(signed_blobs,
+                                  np.vstack([blobs, negative_blobs]))
+
+    # Without the private helpers of scikit-image, blob_doh is run twice
+    monkeypatch.setattr(reconstruction, 'HAS_BLOB_HELPERS', False)
+    np.testing.assert_array_equal(_signed_blob_doh(image, **kwargs),
+                                  signed_blobs)
+
+    # If the private helpers fail, blob_doh is run twice
+    monkeypatch.setattr(reconstruction, 'HAS_BLOB_HELPERS', True)
+
+    def _changed_signature(integral_image, sigma, mode):
+        raise AssertionError('not reached')
+
+    monkeypatch.setattr(reconstruction, '_hessian_matrix_det',
+                        _changed_signature)
+    np.testing.assert_array_equal(_signed_blob_doh(image, **kwargs),
+                                  signed_blobs)
+
+
+def test_unwrap_phase():
+    # unwrap_phase unwraps twice the phase of the wave, which wraps many
+    # times across this ramp
+    x, y = np.mgrid[0:64, 0:64]
+    phase = 0.05 * (x + 2 * y)
+    unwrapped_phase = unwrap_phase(np.exp(1j * phase))
+
+    offset = unwrapped_phase - 2 * phase
+    np.testing.assert_allclose(offset, offset[0, 0], atol=1e-10)
+    assert abs(offset[0, 0] / (2 * np.pi) -
+               np.round(offset[0, 0] / (2 * np.pi))) < 1e-10
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (51, 80)])
+def test_kernel_convolution(shape):
+    from scipy.signal import convolve2d
+    from astropy.convolution import MexicanHat2DKernel
+
+    rng = np.random.RandomState(RANDOM_SEED)
+    image = rng.randn(*shape)
+    kernel = MexicanHat2DKernel(2.0)
+    convolution = KernelConvolution(kernel)
+
+    expected = convolve2d(image, kernel.array, mode='same')
+    np.testing.assert_allclose(convolution(image), expected, atol=1e-12)
+
+    # The kernel spectrum is cached for the image shape
+    spectrum = convolution.kernel_spectrum(shape)
+    convolution(image)
+    assert convolution.kernel_spectrum(shape) is spectrum
+
+
+def test_memory_mapped_holograms(tmpdir):
+    tifffile = pytest.importorskip('tifffile')
+    rng = np.random.RandomState(RANDOM_SEED)
+    holograms = rng.randint(0, 2**12, size=(3, 64, 64)).astype(np.uint16)
+
+    # Multi-page TIFF stack, written at once and page by page
+    stack_path = str(tmpdir.join('stack.tif'))
+    tifffile.imwrite(stack_path, holograms, photometric='minisblack')
+    appended_path = str(tmpdir.join('appended.tif'))
+    for hologram in holograms:
+        tifffile.imwrite(appended_path, hologram, photometric='minisblack',
+                         append=True)
+
+    for tif_path in [stack_path, appended_path]:
+        for page in range(3):
+            holo = Hologram.from_tif(tif_path, page=page, crop_fraction=0.5)
+            assert isinstance(holo._raw_hologram, np.memmap)
+            np.testing.assert_array_equal(holo.hologram,
+                                          holograms[page, 16:48, 16:48])
+            assert holo.hologram.dtype == np.float64
+            assert holo._raw_hologram is None
+
+        with pytest.raises(ValueError):
+            Hologram.from_tif(tif_path, page=3)
+
+    # Color images aren't holograms
+    rgb_path = str(tmpdir.join('rgb.tif'))
+    tifffile.imwrite(rgb_path, holograms.transpose(1, 2, 0).copy(),
+                     photometric='rgb')
+    with pytest.raises(ValueError):
+        Hologram.from_tif(rgb_path)
+
+    # Other image files are decoded
+    png_path = str(tmpdir.join('hologram.png'))
+    imsave(png_path, holograms[0])
+    np.testing.assert_array_equal(Hologram.from_tif(png_path).hologram,
+                                  holograms[0])
+
+    # Raw camera dump with a header
+    raw_path = str(tmpdir.join('dump.raw'))
+    with open(raw_path, 'wb') as raw_file:
+        raw_file.write(b'\0' * 128)
+        raw_file.write(holograms.tobytes())
+    holo = Hologram.from_raw(raw_path, (64, 64), offset=128, frame=2,
+                             dtype=np.float32)
+    np.testing.assert_array_equal(holo.hologram, holograms[2])
+    assert holo.hologram.dtype == np.float32
+
 
+def test_roi_window():
+    # Windows cover the padded ROI, within bounds, with few distinct sizes
+    sizes = set()
+    for start, width in [(100, 10), (300, 37), (5, 20), (990, 30), (0, 1024)]:
+        window = _roi_window(slice(start, start + width), 32, 1024)
+        assert window[0] <= max(start - 32, 0)
+        assert window[-1] >= min(start + width + 32, 1024) - 1
+        assert window[0] >= 0 and window[-1] < 1024
+        assert np.all(np.diff(window) == 1)
+        sizes.add(len(window))
+    assert sizes == {64, 96, 128, 1024}
@@ -0,0 +1,206 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import time
+from multiprocessing import Process, Queue
+
+import numpy as np
+
+from ..store import (open_hdf5_archive, save_digital_phase_mask,
+                     load_digital_phase_mask, create_hdf5_archive,
+                     save_reconstruction, load_reconstruction,
+                     ArchiveWriter)
+
+import h5py
+import pytest
+from skimage.io import imsave
+
+
+def test_digital_phase_mask_roundtrip(tmpdir):
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    h5py.File(hdf5_path, 'w').close()
+
+    f = open_hdf5_archive(hdf5_path)
+    assert load_digital_phase_mask(f) is None
+
+    digital_phase_mask = np.exp(1j * np.random.rand(32, 32))
+    save_digital_phase_mask(f, digital_phase_mask)
+
+    # Saving again replaces the stored mask
+    save_digital_phase_mask(f, 2 * digital_phase_mask)
+    f.close()
+
+    f = open_hdf5_archive(hdf5_path)
+    np.testing.assert_allclose(load_digital_phase_mask(f),
+                               2 * digital_phase_mask)
+    f.close()
+
+
+def _write_tiffs(tmpdir, holograms):
+    hologram_paths = []
+    for i, hologram in enumerate(holograms):
+        path = os.path.join(str(tmpdir), '{0}_holo.tif'.format(i))
+        imsave(path, hologram)
+        hologram_paths.append(path)
+    return hologram_paths
+
+
+@pytest.mark.parametrize("processes", [None, 1, 2])
+def test_create_hdf5_archive(tmpdir, processes):
+    rng = np.random.RandomState(42)
+    holograms = rng.randint(0, 2**12, size=(5, 32, 48)).astype(np.uint16)
+    hologram_paths = _write_tiffs(tmpdir, holograms)
+
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    f = create_hdf5_archive(hdf5_path, hologram_paths, n_z=2,
+                            processes=processes, queue_size=2)
+
+    # Holograms keep the native dtype of the TIFFs, one chunk per frame
+    assert f['holograms'].dtype == np.uint16
+    assert f['holograms'].chunks == (1, 32, 48)
+    np.testing.assert_array_equal(f['holograms'][...], holograms)
+    f.close()
+
+
+@pytest.mark.parametrize("mode", ['complex', 'amplitude_phase', 'roi'])
+def test_reconstruction_roundtrip(tmpdir, mode):
+    rng = np.random.RandomState(42)
+    holograms = rng.randint(0, 2**12, size=(3, 32, 48)).astype(np.uint16)
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    f = create_hdf5_archive(hdf5_path, _write_tiffs(tmpdir, holograms),
+                            n_z=2, processes=1, reconstruction_mode=mode,
+                            reconstruction_dtype=np.complex64)
+
+    # Nothing is allocated until a slice is saved
+    assert load_reconstruction(f, 0, 0) is None
+
+    # Reconstructions of cropped holograms are smaller than the holograms
+    wave = (rng.rand(16, 24) + 0.5) * np.exp(1j * rng.randn(16, 24))
+    rois = [(slice(2, 10), slice(5, 20)), (slice(10, 16), slice(0, 7))]
+    # Slices past ``n_z`` grow the datasets
+    save_reconstruction(f, 1, 3, wave, rois=rois)
+    f.close()
+
+    f = open_hdf5_archive(hdf5_path)
+    loaded = load_reconstruction(f, 1, 3)
+    if mode == 'roi':
+        assert [roi for roi, stamp in loaded] == rois
+        for roi, stamp in loaded:
+            np.testing.assert_allclose(stamp, wave[roi], rtol=1e-6)
+    else:
+        np.testing.assert_allclose(loaded, wave, rtol=1e-5)
+        dataset = f['reconstructed_wavefields' if mode == 'complex' else
+                    'reconstructed_wrapped_phase']
+        assert dataset.shape == (3, 4, 16, 24)
+        assert dataset.chunks == (1, 1, 16, 24)
+
+        if mode == 'amplitude_phase':
+            np.testing.assert_allclose(f['reconstructed_amplitude'][1, 3],
+                                       np.abs(wave), rtol=1e-6)
+
+        # Later slices must have the same shape
+        with pytest.raises(ValueError):
+            save_reconstruction(f, 0, 0, np.ones((32, 48)))
+    f.close()
+
+
+def _produce_slices(queue, hologram_index, n_z):
+    for z_index in range(n_z):
+        queue.put((hologram_index, z_index,
+                   np.full((32, 48), hologram_index + 1j * z_index)))
+
+
+def _read_slice(hdf5_path, hologram_index, z_index, results):
+    # Poll the archive until the slice has been written
+    f = open_hdf5_archive(hdf5_path, mode='r', swmr=True)
+    dataset = f['reconstructed_wavefields']
+    for i in range(500):
+        dataset.refresh()
+        if (z_index < dataset.shape[1] and
+                dataset[hologram_index, z_index, 0, 0] != 0):
+            break
+        time.sleep(0.01)
+    results.put(dataset[hologram_index, z_index, 0, 0])
+    f.close()
+
+
+def test_archive_writer_swmr(tmpdir):
+    rng = np.random.RandomState(42)
+    holograms = rng.randint(0, 2**12, size=(3, 32, 48)).astype(np.uint16)
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    create_hdf5_archive(hdf5_path, _write_tiffs(tmpdir, holograms), n_z=2,
+                        processes=1).close()
+
+    results = Queue()
+    with ArchiveWriter(hdf5_path, (32, 48), queue_size=2) as writer:
+        # Readers open the archive while it is being written, and see slices
+        # written past the initial ``n_z``
+        reader = Process(target=_read_slice,
+                         args=(hdf5_path, 2, 3, results))
+        reader.start()
+
+        producers = [Process(target=_produce_slices,
+                             args=(writer.queue, hologram_index, 4))
+                     for hologram_index in range(1, 3)]
+        for producer in producers:
+            producer.start()
+        writer.put(0, 1, np.full((32, 48), 5j))
+        for producer in producers:
+            producer.join()
+
+        assert results.get(timeout=30) == 2 + 3j
+        reader.join()
+
+    f = open_hdf5_archive(hdf5_path, mode='r', swmr=True)
+    np.testing.assert_array_equal(load_reconstruction(f, 0, 1),
+                                  np.full((32, 48), 5j))
+    for hologram_index in range(1, 3):
+        for z_index in range(4):
+            assert (load_reconstruction(f, hologram_index, z_index) ==
+                    hologram_index + 1j * z_index).all()
+    f.close()
+
+
+def test_archive_writer_roi_mode(tmpdir):
+    rng = np.random.RandomState(42)
+    holograms = rng.randint(0, 2**12, size=(1, 32, 48)).astype(np.uint16)
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    create_hdf5_archive(hdf5_path, _write_tiffs(tmpdir, holograms), n_z=2,
+                        processes=1, reconstruction_mode='roi').close()
+
+    with pytest.raises(ValueError):
+        ArchiveWriter(hdf5_path)
+
+
+def test_archive_writer_failures(tmpdir):
+    rng = np.random.RandomState(42)
+    holograms = rng.randint(0, 2**12, size=(2, 32, 48)).astype(np.uint16)
+    hdf5_path = os.path.join(str(tmpdir), 'archive.hdf5')
+    create_hdf5_archive(hdf5_path, _write_tiffs(tmpdir, holograms), n_z=2,
+                        processes=1).close()
+
+    # A slice of the wrong shape is reported, and later slices are written
+    writer = ArchiveWriter(hdf5_path, (32, 48), queue_size=2,
+                           timeout=0.1).start()
+    writer.put(0, 0, np.ones((5, 5)))
+    with pytest.raises(RuntimeError):
+        for i in range(20):
+            writer.put(1, 1, np.full((32, 48), 1j))
+            time.sleep(0.05)
+    writer.close()
+    assert writer.failures[0][:2] == (0, 0)
+
+    f = open_hdf5_archive(hdf5_path, mode='r')
+    assert (load_reconstruction(f, 1, 1) == 1j).all()
+    f.close()
+
+    # A dead writer raises instead of blocking on the full queue
+    writer = ArchiveWriter(hdf5_path, queue_size=2, timeout=0.1).start()
+    writer._process.terminate()
+    writer._process.join()
+    with pytest.raises(RuntimeError):
+        for i in range(4):
+            writer.put(0, 1, np.ones((32, 48)))
+    with pytest.raises(RuntimeError):
+        writer.close()